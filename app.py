@@ -1,16 +1,34 @@
 """
 FastAPI Inference Service for Cats vs Dogs Classification.
-Endpoints: /health, /predict, /metrics
+Endpoints: /health, /predict, /predict/tensor, /metrics
+/predict and /predict/tensor sit behind an adaptive (AIMD) concurrency limit and honour X-Request-Deadline.
+/admin/memory (ADMIN_TOKEN set): RSS, live images/arrays, tracemalloc top allocation sites.
+CASCADE_ENABLED=1: a fast model answers confident images, the full model the rest (models/cascade.json).
+PHASH_CACHE_SIZE>0: /predict reuses predictions for near-duplicate images (perceptual hash).
+THREAD_PROFILE=latency|throughput: TF/OpenMP/BLAS thread pools sized to the container CPU quota.
 """
 
+import hmac
 import logging
 import os
+import random
 import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+import numpy as np
+
 from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from src import memory
+from src.cascade import apply_temperature, cascade_predict, full_model_temperature, load_cascade_config
+from src.concurrency import DEADLINE_HEADER, AIMDLimiter, deadline_expired, parse_deadline
+from src.phash import NearDuplicateIndex, dhash
+from src.threading_config import configure_threads
+from src import tensor_protocol
 
 # Setup logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -37,25 +55,132 @@ REQUEST_LATENCY = Histogram(
     "Request latency (s)",
     ["endpoint"],
 )
+SHED_COUNT = Counter(
+    "cats_dogs_api_shed_total",
+    "Requests rejected by the concurrency limiter",
+)
+EXPIRED_COUNT = Counter(
+    "cats_dogs_api_deadline_expired_total",
+    "Requests dropped because their deadline passed",
+    ["stage"],
+)
+
+# Adaptive concurrency limit in front of inference
+LIMITER = AIMDLimiter(
+    initial_limit=int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "4")),
+    max_limit=int(os.getenv("CONCURRENCY_MAX_LIMIT", "64")),
+    latency_target_s=float(os.getenv("LATENCY_TARGET_MS", "500")) / 1000,
+)
+# Largest N accepted by /predict/tensor (body size is bounded by the same limit)
+MAX_TENSOR_BATCH = int(os.getenv("MAX_TENSOR_BATCH", "64"))
+CONCURRENCY_LIMIT = Gauge("cats_dogs_api_concurrency_limit", "Current adaptive concurrency limit")
+CONCURRENCY_LIMIT.set_function(lambda: LIMITER.limit)
+INFLIGHT = Gauge("cats_dogs_api_inflight_requests", "Predictions currently holding a limiter slot")
+INFLIGHT.set_function(lambda: LIMITER.inflight)
+STAGE_LATENCY = Histogram(
+    "cats_dogs_api_inference_stage_latency_seconds",
+    "Model inference latency per cascade stage (s)",
+    ["stage"],
+)
+CASCADE_IMAGES = Counter(
+    "cats_dogs_api_cascade_images_total",
+    "Images scored by the cascade fast model",
+)
+CASCADE_ESCALATED = Counter(
+    "cats_dogs_api_cascade_escalated_total",
+    "Images escalated from the fast model to the full model",
+)
+
+UPLOAD_BUFFER_BYTES = Gauge(
+    "cats_dogs_api_upload_buffer_bytes",
+    "Request bodies currently held in memory by /predict endpoints",
+)
+MEMORY_RSS = Gauge("cats_dogs_api_memory_rss_bytes", "Resident set size of the API process")
+MEMORY_RSS.set_function(memory.rss_bytes)
+MEMORY_PEAK_RSS = Gauge("cats_dogs_api_memory_peak_rss_bytes", "Peak resident set size of the API process")
+MEMORY_PEAK_RSS.set_function(memory.peak_rss_bytes)
+TRACED_BYTES = Gauge("cats_dogs_api_tracemalloc_traced_bytes", "Python heap traced by tracemalloc (0 if off)")
+TRACED_BYTES.set_function(memory.traced_bytes)
+LIVE_OBJECTS = Gauge("cats_dogs_api_live_objects", "Live request-path objects", ["kind"])
+for _kind in memory.TRACKED_KINDS:
+    LIVE_OBJECTS.labels(kind=_kind).set_function(lambda k=_kind: memory.live_counts()[k])
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Near-duplicate prediction cache (disabled when PHASH_CACHE_SIZE=0)
+PHASH_CACHE_SIZE = int(os.getenv("PHASH_CACHE_SIZE", "0"))
+PHASH_VERIFY_RATE = float(os.getenv("PHASH_VERIFY_RATE", "0.05"))
+PHASH_INDEX = (
+    NearDuplicateIndex(PHASH_CACHE_SIZE, int(os.getenv("PHASH_MAX_DISTANCE", "4")))
+    if PHASH_CACHE_SIZE > 0 else None
+)
+PHASH_LOOKUPS = Counter(
+    "cats_dogs_api_phash_lookups_total",
+    "Near-duplicate cache lookups",
+    ["result"],
+)
+PHASH_VERIFIED = Counter(
+    "cats_dogs_api_phash_verified_total",
+    "Sampled cache hits re-run through the model, by whether the label agreed",
+    ["agreement"],
+)
+PHASH_ENTRIES = Gauge("cats_dogs_api_phash_cache_entries", "Entries in the near-duplicate cache")
+PHASH_ENTRIES.set_function(lambda: len(PHASH_INDEX) if PHASH_INDEX is not None else 0)
 
 MODEL = None
+FAST_MODEL = None
+CASCADE = None
+FULL_TEMPERATURE = 1.0
 CLASSES = ["cat", "dog"]
 
 
 def load_model():
-    global MODEL
+    global MODEL, FAST_MODEL, CASCADE, FULL_TEMPERATURE
     try:
-        import tensorflow as tf
-        model_path = Path("models/model.h5")
-        if not model_path.exists():
-            model_path = Path("models/model.keras")
-        if model_path.exists():
-            MODEL = tf.keras.models.load_model(str(model_path))
-            logger.info("✓ Model loaded")
-        else:
-            logger.warning("No model file found at models/model.h5 or models/model.keras")
+        from src.inference import load_keras_model, resolve_model_path
+        MODEL = load_keras_model()
+        logger.info("✓ Model loaded")
+        # Calibrated by train_cascade(); used with or without the cascade
+        FULL_TEMPERATURE = full_model_temperature(load_cascade_config(), str(resolve_model_path()))
+        if FULL_TEMPERATURE != 1.0:
+            logger.info(f"✓ Full model temperature {FULL_TEMPERATURE:.2f}")
+    except FileNotFoundError as e:
+        logger.warning(str(e))
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
+    if os.getenv("CASCADE_ENABLED", "0") == "1":
+        try:
+            from src.inference import load_keras_model
+            config = load_cascade_config()
+            if config is None:
+                raise FileNotFoundError("models/cascade.json not found; run train_cascade()")
+            FAST_MODEL = load_keras_model(config["fast_model"])
+            CASCADE = config
+            logger.info(f"✓ Cascade enabled (threshold={config['threshold']:.3f})")
+        except Exception as e:
+            logger.error(f"Cascade disabled: {e}")
+
+
+def _predict_probs(batch: np.ndarray) -> np.ndarray:
+    """Class probabilities for a float32 batch, through the cascade when enabled."""
+    def _timed(model, stage):
+        def run(x):
+            start = time.perf_counter()
+            out = model.predict(x, verbose=0)
+            STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+            return out
+        return run
+
+    if FAST_MODEL is None or CASCADE is None:
+        probs = _timed(MODEL, "full")(batch)
+        return apply_temperature(np.asarray(probs), FULL_TEMPERATURE) if FULL_TEMPERATURE != 1.0 else probs
+    probs, escalated = cascade_predict(
+        batch, _timed(FAST_MODEL, "fast"), _timed(MODEL, "full"),
+        CASCADE["threshold"], CASCADE.get("temperature", 1.0), FULL_TEMPERATURE,
+    )
+    CASCADE_IMAGES.inc(len(batch))
+    CASCADE_ESCALATED.inc(int(escalated.sum()))
+    return probs
 
 
 app = FastAPI(
@@ -86,12 +211,17 @@ async def log_and_measure(request: Request, call_next):
 
 @app.on_event("startup")
 async def startup_event():
+    frames = int(os.getenv("TRACEMALLOC_FRAMES", "0"))
+    if frames > 0:
+        memory.start_tracing(frames)
+    # Before the model load imports TensorFlow, so its pools match the CPU quota
+    configure_threads()
     load_model()
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "model_loaded": MODEL is not None}
+    return {"status": "healthy", "model_loaded": MODEL is not None, "cascade": CASCADE is not None}
 
 
 @app.get("/metrics")
@@ -99,30 +229,171 @@ async def metrics():
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
-@app.post("/predict")
-async def predict(file: UploadFile = File(..., description="Cat or dog image (jpg/png)")):
+def _check_deadline(deadline, stage: str):
+    if deadline_expired(deadline):
+        EXPIRED_COUNT.labels(stage=stage).inc()
+        raise HTTPException(504, f"Deadline expired before {stage}")
+
+
+def _preprocess_and_hash(contents: bytes):
+    """Decoded (1, 224, 224, 3) array and its perceptual hash (None if the cache is off)."""
+    from src.preprocessing import preprocess_for_inference
+    img_array = preprocess_for_inference(contents)
+    return img_array, dhash(img_array) if PHASH_INDEX is not None else None
+
+
+@asynccontextmanager
+async def _inference_slot(request: Request):
+    """
+    Admit a request through the deadline check and concurrency limiter; yields its deadline.
+    The slot's latency feeds the limiter only if the body completes without error, divided
+    by request.state.images (set by batch endpoints) so it compares per image to the target.
+    """
     if MODEL is None:
         raise HTTPException(500, "Model not loaded")
     try:
-        contents = await file.read()
-        from src.preprocessing import preprocess_for_inference
-        img_array = preprocess_for_inference(contents)
-        probs = MODEL.predict(img_array, verbose=0)[0]
-        pred_idx = int(probs.argmax())
-        label = CLASSES[pred_idx]
-        prob = float(probs[pred_idx])
-        logger.info(f"prediction={label} prob={prob:.3f}")
-        return {
-            "label": label,
-            "class_id": pred_idx,
-            "probabilities": {CLASSES[i]: float(probs[i]) for i in range(len(CLASSES))},
-            "confidence": prob,
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.exception("Prediction failed")
+        deadline = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    except ValueError as e:
         raise HTTPException(400, str(e))
+    _check_deadline(deadline, "queue")
+    if not LIMITER.try_acquire():
+        SHED_COUNT.inc()
+        raise HTTPException(503, "Server overloaded, retry later", headers={"Retry-After": "1"})
+    start = time.perf_counter()
+    latency = None
+    try:
+        yield deadline
+        latency = (time.perf_counter() - start) / max(getattr(request.state, "images", 1), 1)
+    finally:
+        LIMITER.release(latency)
+
+
+@app.post("/predict")
+async def predict(request: Request, file: UploadFile = File(..., description="Cat or dog image (jpg/png)")):
+    async with _inference_slot(request) as deadline:
+        held = 0
+        try:
+            contents = await file.read()
+            held = len(contents)
+            UPLOAD_BUFFER_BYTES.inc(held)
+            _check_deadline(deadline, "decode")
+            img_array, phash = await run_in_threadpool(_preprocess_and_hash, contents)
+            cached = PHASH_INDEX.lookup(phash) if phash is not None else None
+            if cached is not None:
+                PHASH_LOOKUPS.labels(result="hit").inc()
+                probs = cached[0]
+                if random.random() < PHASH_VERIFY_RATE:
+                    _check_deadline(deadline, "inference")
+                    fresh = (await run_in_threadpool(_predict_probs, img_array))[0]
+                    agreement = "agree" if fresh.argmax() == probs.argmax() else "disagree"
+                    PHASH_VERIFIED.labels(agreement=agreement).inc()
+                    probs = fresh
+            else:
+                if phash is not None:
+                    PHASH_LOOKUPS.labels(result="miss").inc()
+                _check_deadline(deadline, "inference")
+                probs = (await run_in_threadpool(_predict_probs, img_array))[0]
+                if phash is not None:
+                    PHASH_INDEX.insert(phash, probs)
+            pred_idx = int(probs.argmax())
+            label = CLASSES[pred_idx]
+            prob = float(probs[pred_idx])
+            logger.info(f"prediction={label} prob={prob:.3f}")
+            return {
+                "label": label,
+                "class_id": pred_idx,
+                "probabilities": {CLASSES[i]: float(probs[i]) for i in range(len(CLASSES))},
+                "confidence": prob,
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Prediction failed")
+            raise HTTPException(400, str(e))
+        finally:
+            UPLOAD_BUFFER_BYTES.dec(held)
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """Request body, or 413 as soon as it grows past max_bytes (covers chunked uploads)."""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(413, f"Body exceeds MAX_TENSOR_BATCH={MAX_TENSOR_BATCH} images")
+    return bytes(body)
+
+
+@app.post("/predict/tensor")
+async def predict_tensor(request: Request):
+    """
+    Binary fast path for callers holding decoded images: uint8 (N, 224, 224, 3) as raw
+    bytes or msgpack in, float32 (N, 2) probabilities out. See src/tensor_protocol.py.
+    Batches over MAX_TENSOR_BATCH images are rejected with 413.
+    """
+    max_bytes = MAX_TENSOR_BATCH * tensor_protocol.IMAGE_NBYTES + 1024  # msgpack framing
+    try:
+        declared = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPException(400, "Invalid Content-Length")
+    if declared > max_bytes:
+        raise HTTPException(413, f"Body exceeds MAX_TENSOR_BATCH={MAX_TENSOR_BATCH} images")
+    async with _inference_slot(request) as deadline:
+        content_type = request.headers.get("content-type", "")
+        body = await _read_body(request, max_bytes)
+        UPLOAD_BUFFER_BYTES.inc(len(body))
+        try:
+            try:
+                images = tensor_protocol.decode_tensor_request(body, content_type)
+            except LookupError as e:
+                raise HTTPException(415, str(e))
+            except (ValueError, KeyError, TypeError) as e:
+                raise HTTPException(400, str(e))
+            if len(images) > MAX_TENSOR_BATCH:
+                raise HTTPException(413, f"Batch of {len(images)} exceeds MAX_TENSOR_BATCH={MAX_TENSOR_BATCH}")
+            request.state.images = len(images)
+            _check_deadline(deadline, "inference")
+            batch = memory.track(np.multiply(images, np.float32(1 / 255.0), dtype=np.float32), "ndarray")
+            probs = await run_in_threadpool(_predict_probs, batch)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Tensor prediction failed")
+            raise HTTPException(400, str(e))
+        finally:
+            UPLOAD_BUFFER_BYTES.dec(len(body))
+        accept = request.headers.get("accept", "")
+        media_type = accept if tensor_protocol.MSGPACK in accept else content_type
+        payload, media_type = tensor_protocol.encode_probabilities(probs, CLASSES, media_type)
+        return Response(payload, media_type=media_type, headers={"X-Classes": ",".join(CLASSES)})
+
+
+def _require_admin(request: Request):
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and require it in X-Admin-Token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(404, "Not Found")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        raise HTTPException(403, "Invalid admin token")
+
+
+@app.get("/admin/memory")
+async def admin_memory(request: Request, limit: int = 20, growth: bool = False):
+    """RSS, peak RSS, live images/arrays and top tracemalloc sites (growth=true: since tracing started)."""
+    _require_admin(request)
+    return await run_in_threadpool(memory.memory_report, limit, growth)
+
+
+@app.post("/admin/memory/tracemalloc")
+async def admin_tracemalloc(request: Request, action: str = "start", frames: int = 10):
+    """Start (and take a baseline snapshot) or stop tracemalloc."""
+    _require_admin(request)
+    if action == "start":
+        memory.start_tracing(frames)
+    elif action == "stop":
+        memory.stop_tracing()
+    else:
+        raise HTTPException(400, "action must be start or stop")
+    return {"tracing": action == "start"}
 
 
 @app.get("/")
@@ -134,6 +405,7 @@ async def root():
         "endpoints": {
             "/health": "GET",
             "/predict": "POST (multipart image) – use Swagger at /docs",
+            "/predict/tensor": "POST (uint8 224x224x3 tensors, octet-stream or msgpack)",
             "/metrics": "GET",
         },
     }
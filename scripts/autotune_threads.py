@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Sweep TensorFlow intra/inter-op thread counts and batch sizes on this machine and write
+the best settings for throughput and for p99 latency to models/thread_config.json.
+Each thread setting runs in a fresh process (TF pools are fixed once created).
+Usage: python scripts/autotune_threads.py [--intra 1 2 4] [--inter 1 2] [--batch-sizes 1 8 32 64]
+       [--iterations 50] [--model models/model.h5 | --architecture simple_cnn]
+The service picks a profile with THREAD_PROFILE=latency|throughput (default latency).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.threading_config import (
+    THREAD_CONFIG, candidate_thread_counts, effective_cpus, save_thread_config,
+    select_profiles, thread_env,
+)
+
+
+def _load(model_path, architecture):
+    """Trained model if one exists, else an untrained registry build (same compute cost)."""
+    from src.inference import load_keras_model
+    try:
+        return load_keras_model(model_path)
+    except FileNotFoundError:
+        if model_path:
+            raise
+        from src.training import build_model
+        return build_model(architecture)
+
+
+def run_worker(spec: dict) -> list:
+    """Time model.predict per batch size under the thread settings in spec (child process)."""
+    import numpy as np
+    from src.threading_config import apply_thread_settings
+
+    apply_thread_settings({"intra_op": spec["intra_op"], "inter_op": spec["inter_op"], "cpus": spec["cpus"]})
+    model = _load(spec["model"], spec["architecture"])
+    rng = np.random.default_rng(0)
+    results = []
+    for batch_size in spec["batch_sizes"]:
+        x = rng.random((batch_size, 224, 224, 3), dtype=np.float32)
+        for _ in range(spec["warmup"]):
+            model.predict(x, verbose=0)
+        latencies = []
+        for _ in range(spec["iterations"]):
+            start = time.perf_counter()
+            model.predict(x, verbose=0)
+            latencies.append(time.perf_counter() - start)
+        lat_ms = np.array(latencies) * 1000
+        results.append({
+            "intra_op": spec["intra_op"],
+            "inter_op": spec["inter_op"],
+            "batch_size": batch_size,
+            "images_per_s": round(batch_size * len(latencies) / float(np.sum(latencies)), 2),
+            "p50_ms": round(float(np.percentile(lat_ms, 50)), 3),
+            "p99_ms": round(float(np.percentile(lat_ms, 99)), 3),
+        })
+    return results
+
+
+def run_trial(spec: dict) -> list:
+    """run_worker in a subprocess whose TF/OpenMP/BLAS env matches spec."""
+    env = thread_env(spec, dict(os.environ, LOG_LEVEL="WARNING", TF_CPP_MIN_LOG_LEVEL="2"))
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", json.dumps(spec)],
+        capture_output=True, text=True, env=env, cwd=str(ROOT),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Trial {spec['intra_op']}x{spec['inter_op']} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intra", type=int, nargs="+", default=None, help="default: 1, 2, 4 ... effective CPUs")
+    parser.add_argument("--inter", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--model", default=None, help="default: models/model.h5 or models/model.keras")
+    parser.add_argument("--architecture", default="simple_cnn", help="untrained build when no model exists")
+    parser.add_argument("--output", default=THREAD_CONFIG)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker))))
+        return 0
+
+    cpus = effective_cpus()
+    intra_counts = args.intra or candidate_thread_counts(cpus)
+    print(f"Effective CPUs: {cpus}; intra={intra_counts} inter={args.inter} batch_sizes={args.batch_sizes}")
+    print(f"{'intra':>6}{'inter':>6}{'batch':>7}{'img/s':>10}{'p50_ms':>10}{'p99_ms':>10}")
+    trials = []
+    for intra in intra_counts:
+        for inter in args.inter:
+            spec = {
+                "intra_op": intra, "inter_op": inter, "cpus": cpus,
+                "batch_sizes": args.batch_sizes, "iterations": args.iterations, "warmup": args.warmup,
+                "model": args.model, "architecture": args.architecture,
+            }
+            for t in run_trial(spec):
+                trials.append(t)
+                print(f"{t['intra_op']:>6}{t['inter_op']:>6}{t['batch_size']:>7}{t['images_per_s']:>10.1f}"
+                      f"{t['p50_ms']:>10.2f}{t['p99_ms']:>10.2f}")
+
+    profiles = select_profiles(trials)
+    save_thread_config({"cpus": cpus, "profiles": profiles, "trials": trials}, args.output)
+    for name, p in profiles.items():
+        print(f"{name}: intra_op={p['intra_op']} inter_op={p['inter_op']} batch_size={p['batch_size']} "
+              f"({p['images_per_s']:.1f} img/s, p99 {p['p99_ms']:.2f} ms)")
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
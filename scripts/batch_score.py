@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of a directory tree or tar archive of images.
+Usage: python scripts/batch_score.py <dir|archive.tar[.gz]> <output.jsonl|output.parquet> [options]
+Re-running with the same output resumes from its checkpoint (<output>.ckpt.json);
+if the source's already scored images changed since, it stops and asks for --no-resume.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.batch_scoring import FORMATS, score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="image directory or tar archive")
+    parser.add_argument("output", help="JSONL file, or directory of Parquet parts")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from output extension")
+    parser.add_argument("--model", default=None, help="default: models/model.h5 or models/model.keras")
+    parser.add_argument("--batch-size", type=int, default=None, help="default: autotuned, else 64")
+    parser.add_argument("--workers", type=int, default=None, help="decode processes (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    try:
+        stats = score(
+            args.source,
+            args.output,
+            fmt=args.format,
+            model_path=args.model,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            resume=not args.no_resume,
+        )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
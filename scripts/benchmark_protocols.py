@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compare /predict (multipart JPEG) with /predict/tensor (raw bytes / msgpack).
+Reports client-side latency and server CPU per request (from process_cpu_seconds_total).
+Usage: python scripts/benchmark_protocols.py [base_url] [num_requests] [batch_size]
+"""
+
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import requests
+from PIL import Image
+
+# Add project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.tensor_protocol import HAS_MSGPACK, MSGPACK, OCTET_STREAM, decode_probabilities, encode_tensor_request
+
+
+def server_cpu_seconds(base_url):
+    """Server process CPU time; None if the process collector is unavailable (non-Linux)."""
+    for line in requests.get(f"{base_url}/metrics", timeout=10).text.splitlines():
+        if line.startswith("process_cpu_seconds_total"):
+            return float(line.split()[-1])
+    return None
+
+
+def run(base_url, name, send, n, images_per_request):
+    send()  # warm-up
+    cpu_before = server_cpu_seconds(base_url)
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - start) * 1000)
+    cpu_after = server_cpu_seconds(base_url)
+    lat = np.array(latencies)
+    cpu_ms = (cpu_after - cpu_before) * 1000 / (n * images_per_request) if cpu_before is not None else float("nan")
+    print(f"{name:<22}{np.median(lat):>10.2f}{np.percentile(lat, 95):>10.2f}"
+          f"{np.median(lat) / images_per_request:>12.2f}{cpu_ms:>14.2f}")
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (224, 224, 3), dtype=np.uint8)
+    batch = rng.integers(0, 255, (batch_size, 224, 224, 3), dtype=np.uint8)
+    buf = BytesIO()
+    Image.fromarray(image).save(buf, format="JPEG")
+    jpeg = buf.getvalue()
+
+    def multipart():
+        r = requests.post(f"{base_url}/predict", files={"file": ("x.jpg", jpeg, "image/jpeg")}, timeout=30)
+        r.raise_for_status()
+        return r.json()["probabilities"]
+
+    def tensor(images, media_type):
+        body = encode_tensor_request(images, media_type)
+
+        def send():
+            r = requests.post(f"{base_url}/predict/tensor", data=body,
+                              headers={"Content-Type": media_type}, timeout=30)
+            r.raise_for_status()
+            return decode_probabilities(r.content, r.headers["content-type"])
+        return send
+
+    print(f"Benchmark {base_url} | {n} requests per mode | batch={batch_size}")
+    print(f"{'mode':<22}{'p50_ms':>10}{'p95_ms':>10}{'p50/img_ms':>12}{'cpu/img_ms':>14}")
+    run(base_url, "multipart jpeg", multipart, n, 1)
+    run(base_url, "tensor raw", tensor(image, OCTET_STREAM), n, 1)
+    run(base_url, f"tensor raw x{batch_size}", tensor(batch, OCTET_STREAM), n, batch_size)
+    if HAS_MSGPACK:
+        run(base_url, "tensor msgpack", tensor(image, MSGPACK), n, 1)
+        run(base_url, f"tensor msgpack x{batch_size}", tensor(batch, MSGPACK), n, batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
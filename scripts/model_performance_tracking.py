@@ -11,7 +11,6 @@ from pathlib import Path
 from io import BytesIO
 import numpy as np
 from PIL import Image
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
 
 # Add project root
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -36,62 +35,45 @@ def create_synthetic_batch(n=20, seed=42):
 
 
 def load_real_test_data(data_dir="data/raw/cats_vs_dogs", max_per_class=20):
-    """Load real test images if available. Returns (images, labels) or (None, None)."""
-    from pathlib import Path
-    test_dir = Path(data_dir) / "test"
-    if not test_dir.exists():
+    """Load real test images from the dataset manifest. Returns (images, labels) or (None, None)."""
+    from src.manifest import dedupe, update_manifest
+    if not (Path(data_dir) / "test").exists():
         return None, None
+    entries = dedupe(e for e in update_manifest(data_dir) if e["valid"])
     images, labels = [], []
-    for cls_dir in sorted(test_dir.iterdir()):
-        if not cls_dir.is_dir():
+    per_class = {}
+    for e in entries:
+        if e["split"] != "test" or per_class.get(e["label"], 0) >= max_per_class:
             continue
-        label = 1 if "dog" in cls_dir.name.lower() else 0
-        for fp in list(cls_dir.glob("*.jpg"))[:max_per_class] + list(cls_dir.glob("*.png"))[:5]:
-            try:
-                with open(fp, "rb") as f:
-                    images.append(f.read())
-                labels.append(label)
-            except Exception:
-                pass
+        with open(Path(data_dir) / e["path"], "rb") as f:
+            images.append(f.read())
+        labels.append(e["label"])
+        per_class[e["label"]] = per_class.get(e["label"], 0) + 1
     return (images, labels) if images else (None, None)
 
 
 def evaluate_model(base_url="http://localhost:8000", images=None, labels=None):
-    """Send batch to API, collect predictions, compute metrics."""
+    """Send batch to API, collect predicted probabilities, compute metrics (src/evaluation.py)."""
+    from src.evaluation import StreamingEvaluator
     if not images or not labels:
         images, labels = create_synthetic_batch(n=40)
 
-    predictions = []
-    for img_bytes in images:
+    evaluator = StreamingEvaluator()
+    for img_bytes, label in zip(images, labels):
         r = requests.post(
             f"{base_url}/predict",
             files={"file": ("img.jpg", img_bytes, "image/jpeg")},
             timeout=10,
         )
         if r.status_code != 200:
-            predictions.append(-1)  # mark failure
-            continue
-        out = r.json()
-        pred = 1 if out.get("label") == "dog" else 0
-        predictions.append(pred)
+            continue  # failed requests are excluded from metrics
+        probs = r.json()["probabilities"]
+        evaluator.update([label], [[probs["cat"], probs["dog"]]])
 
-    valid = [i for i, p in enumerate(predictions) if p >= 0]
-    if not valid:
+    if evaluator.n_samples == 0:
         print("No successful predictions")
         return {}
-
-    y_true = [labels[i] for i in valid]
-    y_pred = [predictions[i] for i in valid]
-    metrics = {
-        "accuracy": accuracy_score(y_true, y_pred),
-        "precision": precision_score(y_true, y_pred, zero_division=0),
-        "recall": recall_score(y_true, y_pred, zero_division=0),
-        "f1": f1_score(y_true, y_pred, zero_division=0),
-        "n_samples": len(valid),
-    }
-    cm = confusion_matrix(y_true, y_pred)
-    metrics["confusion_matrix"] = cm.tolist()
-    return metrics
+    return evaluator.result()
 
 
 def main():
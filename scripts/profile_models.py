@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Train, profile and pick an architecture within a CPU latency budget.
+Usage: python scripts/profile_models.py [--budget-ms 20] [--epochs 3] [--candidates simple_cnn gap_cnn ...]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.training import ARCHITECTURES, train_and_track
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", nargs="+", choices=sorted(ARCHITECTURES), default=sorted(ARCHITECTURES))
+    parser.add_argument("--budget-ms", type=float, default=None, help="single-image CPU latency budget")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--data", default="data/processed/dataset.npz")
+    args = parser.parse_args()
+
+    train_and_track(
+        data_path=args.data,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        candidates=args.candidates,
+        latency_budget_ms=args.budget_ms,
+    )
+    with open("logs/model_profiles.json") as f:
+        report = json.load(f)
+
+    print(f"{'model':<15}{'params':>10}{'size_kb':>10}{'single_ms':>11}{'batch/img_ms':>14}{'val_acc':>9}")
+    for name, p in report["profiles"].items():
+        marker = " *" if name == report["selected"] else ""
+        print(f"{name:<15}{p['params']:>10}{p['file_size_bytes'] / 1024:>10.0f}{p['latency_single_ms']:>11.2f}"
+              f"{p['latency_per_image_batched_ms']:>14.2f}{p['accuracy']:>9.3f}{marker}")
+    print(f"Selected {report['selected']} -> models/model.h5")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
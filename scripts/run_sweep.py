@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter sweep over build_cnn / training parameters.
+Usage: python scripts/run_sweep.py [--strategy grid|random|halving] [--trials N] [--workers N] ...
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.sweep import STRATEGIES, run_sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", choices=STRATEGIES, default="random")
+    parser.add_argument("--data", default="data/processed/dataset.npz")
+    parser.add_argument("--trials", type=int, default=8, help="configs to sample (random/halving)")
+    parser.add_argument("--min-epochs", type=int, default=1)
+    parser.add_argument("--max-epochs", type=int, default=3)
+    parser.add_argument("--eta", type=int, default=3, help="keep top 1/eta trials at each rung")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--no-prune", action="store_true", help="grid/random: train every config to max epochs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = run_sweep(
+        strategy=args.strategy,
+        data_path=args.data,
+        n_trials=args.trials,
+        min_epochs=args.min_epochs,
+        max_epochs=args.max_epochs,
+        eta=args.eta,
+        workers=args.workers,
+        prune=not args.no_prune,
+        seed=args.seed,
+    )
+    if not results:
+        print("No trials completed")
+        return 1
+    best = results[0]
+    print(f"Best: val_acc={best['val_accuracy']:.4f} epochs={best['epochs']} config={best['config']}")
+    print("Saved to logs/sweep_results.json")
+    print(f"Retrain: train_and_track(model_params={best['model_params']}, **{best['train_params']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
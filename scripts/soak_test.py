@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+In-process soak test: drive the API for N requests and fail if memory keeps growing.
+Usage: python scripts/soak_test.py [--requests 5000] [--warmup 500] [--max-growth-mb 64] [--trace]
+Measures RSS after warmup and at the end; exits 1 if growth exceeds the bound.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("ADMIN_TOKEN", "soak-test")
+# Per-request INFO logs would dominate the run
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def make_payloads(n=16, seed=0):
+    """JPEGs of varying size/quality, plus one raw tensor body."""
+    from src.tensor_protocol import encode_tensor_request
+    rng = np.random.default_rng(seed)
+    jpegs = []
+    for i in range(n):
+        h, w = rng.integers(100, 800, 2)
+        img = Image.fromarray(rng.integers(0, 255, (h, w, 3), dtype=np.uint8))
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=int(rng.integers(50, 95)))
+        jpegs.append(buf.getvalue())
+    tensor = encode_tensor_request(rng.integers(0, 255, (4, 224, 224, 3), dtype=np.uint8))
+    return jpegs, tensor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--max-growth-mb", type=float, default=64.0)
+    parser.add_argument("--report-every", type=int, default=500)
+    parser.add_argument("--trace", action="store_true", help="tracemalloc growth report at the end (slower)")
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    import app
+    from src import memory
+
+    app.load_model()
+    if app.MODEL is None:
+        print("Soak test needs a trained model (models/model.h5)")
+        return 1
+    client = TestClient(app.app)
+    admin = {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+    jpegs, tensor = make_payloads()
+
+    def send(i):
+        if i % 5 == 4:
+            r = client.post("/predict/tensor", content=tensor, headers={"Content-Type": "application/octet-stream"})
+        else:
+            r = client.post("/predict", files={"file": ("x.jpg", jpegs[i % len(jpegs)], "image/jpeg")})
+        if r.status_code != 200:
+            raise RuntimeError(f"Request {i} failed: {r.status_code} {r.text}")
+
+    for i in range(args.warmup):
+        send(i)
+    gc.collect()
+    if args.trace:
+        client.post("/admin/memory/tracemalloc", params={"action": "start"}, headers=admin)
+    baseline = memory.rss_bytes()
+    print(f"After {args.warmup} warmup requests: rss={baseline / 2**20:.1f} MiB")
+
+    for i in range(args.requests):
+        send(i)
+        if (i + 1) % args.report_every == 0:
+            live = memory.live_counts()
+            print(f"{i + 1:>7} requests: rss={memory.rss_bytes() / 2**20:.1f} MiB "
+                  f"peak={memory.peak_rss_bytes() / 2**20:.1f} MiB live={live}")
+
+    gc.collect()
+    growth_mb = (memory.rss_bytes() - baseline) / 2**20
+    if args.trace:
+        report = client.get("/admin/memory", params={"limit": 10, "growth": True}, headers=admin).json()
+        print("Top allocation growth:")
+        for site in report["tracemalloc"]["top"]:
+            print(f"  {site['size_diff_bytes'] / 1024:>10.1f} KiB  {site['site']}")
+
+    print(f"RSS growth over {args.requests} requests: {growth_mb:.1f} MiB (bound {args.max_growth_mb} MiB)")
+    if growth_mb > args.max_growth_mb:
+        print("Soak test FAILED: memory grew beyond bound")
+        return 1
+    print("Soak test passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """
 Stress test the API to generate metrics for Prometheus.
-Usage: python scripts/stress_test.py [base_url] [num_requests] [concurrency]
+Usage: python scripts/stress_test.py [base_url] [num_requests] [concurrency] [deadline_s]
+Each request carries X-Request-Deadline = now + deadline_s (default 10 s, the client timeout).
 """
 import sys
+import time
 import concurrent.futures
+from collections import Counter
 from io import BytesIO
 from pathlib import Path
 
@@ -23,34 +26,41 @@ def create_test_image():
     return buf.getvalue()
 
 
-def single_predict_request(base_url):
-    """Make one POST /predict request."""
+def single_predict_request(base_url, deadline_s=10.0):
+    """Make one POST /predict request; returns the HTTP status, or 'timeout'/'error'."""
     try:
         img = create_test_image()
         r = requests.post(
             f"{base_url}/predict",
             files={"file": ("test.jpg", img, "image/jpeg")},
+            headers={"X-Request-Deadline": f"{time.time() + deadline_s:.3f}"},
             timeout=10,
         )
-        r.raise_for_status()
-        return 1
+        return r.status_code
+    except requests.Timeout:
+        return "timeout"
     except Exception:
-        return 0
+        return "error"
 
 
 def main():
     base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
     num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 100
     concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    deadline_s = float(sys.argv[4]) if len(sys.argv) > 4 else 10.0
 
     print(f"Stress test POST /predict: {base_url} | {num_requests} requests | {concurrency} workers")
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-        futures = [executor.submit(single_predict_request, base_url) for _ in range(num_requests)]
-        success = sum(f.result() for f in concurrent.futures.as_completed(futures))
+        futures = [executor.submit(single_predict_request, base_url, deadline_s) for _ in range(num_requests)]
+        statuses = Counter(f.result() for f in concurrent.futures.as_completed(futures))
 
-    print(f"Done: {success}/{num_requests} successful")
-    print("Check Prometheus: cats_dogs_api_requests_total, cats_dogs_api_request_latency_seconds")
+    print(f"Done: {statuses.get(200, 0)}/{num_requests} successful")
+    print(f"  shed (503): {statuses.get(503, 0)} | deadline expired (504): {statuses.get(504, 0)} | "
+          f"client timeouts: {statuses.get('timeout', 0)} | other: "
+          f"{num_requests - sum(statuses.get(k, 0) for k in (200, 503, 504, 'timeout'))}")
+    print("Check Prometheus: cats_dogs_api_requests_total, cats_dogs_api_request_latency_seconds,")
+    print("  cats_dogs_api_shed_total, cats_dogs_api_deadline_expired_total, cats_dogs_api_concurrency_limit")
 
 
 if __name__ == "__main__":
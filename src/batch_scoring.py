@@ -0,0 +1,301 @@
+"""
+Offline bulk scoring of image directories and tar archives.
+- Streams images (directory tree or .tar/.tar.gz), decodes in a process pool
+- Batched inference with the same model loading as the API
+- Writes JSONL or Parquet incrementally, checkpointing after every commit
+- Resume skips the items already processed, after checking they are still the same
+  keys in the same order (a chained digest of the keys is stored in the checkpoint)
+- At most `prefetch` batches are in flight, so memory stays flat
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing as mp
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.preprocessing import CLASSES, IMG_SIZE, decode_image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+FORMATS = ("jsonl", "parquet")
+
+# (key, path or raw bytes)
+SourceItem = Tuple[str, Union[str, bytes]]
+
+
+def chain_digest(digest: str, keys: List[str]) -> str:
+    """Extend a running digest of source keys in order ("" for none)."""
+    for key in keys:
+        digest = hashlib.sha256(f"{digest}\n{key}".encode()).hexdigest()
+    return digest
+
+
+def iter_source(source: str, skip: int = 0, skip_digest: Optional[str] = None) -> Iterator[SourceItem]:
+    """
+    Yield (key, payload) in a deterministic order, after the first `skip` images.
+    Directory: payload is the file path (workers read it). Tar: payload is the member bytes.
+    skip_digest: chain_digest of the skipped keys as recorded earlier; ValueError is raised
+    before anything is yielded if the source no longer starts with those keys.
+    """
+    src = Path(source)
+    if not src.exists():
+        raise ValueError(f"Source not found: {source}")
+    if src.is_dir():
+        def _items():
+            for dirpath, dirnames, filenames in os.walk(src):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if Path(name).suffix.lower() in IMAGE_EXTENSIONS:
+                        path = Path(dirpath) / name
+                        yield str(path.relative_to(src)), lambda path=path: str(path)
+    elif tarfile.is_tarfile(src):
+        def _items():
+            with tarfile.open(src, mode="r|*") as tar:
+                for member in tar:
+                    if member.isfile() and Path(member.name).suffix.lower() in IMAGE_EXTENSIONS:
+                        yield member.name, lambda member=member: tar.extractfile(member).read()
+    else:
+        raise ValueError(f"Source must be a directory or tar archive: {source}")
+
+    seen, digest = 0, ""
+    for key, load in _items():
+        seen += 1
+        if seen <= skip:
+            if skip_digest is not None:
+                digest = chain_digest(digest, [key])
+                if seen == skip and digest != skip_digest:
+                    raise ValueError(f"{source} changed since the checkpoint (items before {key!r} differ)")
+            continue
+        yield key, load()
+    if seen < skip and skip_digest is not None:
+        raise ValueError(f"{source} changed since the checkpoint (has {seen} images, {skip} were processed)")
+
+
+def _batched(items: Iterator, n: int) -> Iterator[list]:
+    while True:
+        chunk = list(islice(items, n))
+        if not chunk:
+            return
+        yield chunk
+
+
+def decode_batch(items: List[SourceItem]) -> Tuple[List[str], np.ndarray, List[Tuple[str, str]]]:
+    """Decode a chunk to uint8 (N, H, W, 3); undecodable items are returned as (key, error)."""
+    keys, arrays, errors = [], [], []
+    for key, payload in items:
+        try:
+            arrays.append(decode_image(payload, IMG_SIZE))
+            keys.append(key)
+        except Exception as e:
+            errors.append((key, str(e)))
+    stacked = np.stack(arrays) if arrays else np.empty((0, *IMG_SIZE, 3), dtype=np.uint8)
+    return keys, stacked, errors
+
+
+def prediction_rows(keys: List[str], probs: np.ndarray, errors: List[Tuple[str, str]]) -> List[dict]:
+    """Output rows in the /predict response shape, flattened; error rows have null predictions."""
+    rows = []
+    for key, p in zip(keys, probs):
+        idx = int(p.argmax())
+        rows.append({
+            "path": key,
+            "label": CLASSES[idx],
+            "class_id": idx,
+            "confidence": float(p[idx]),
+            **{f"prob_{c}": float(p[i]) for i, c in enumerate(CLASSES)},
+            "error": None,
+        })
+    empty = {"label": None, "class_id": None, "confidence": None, **{f"prob_{c}": None for c in CLASSES}}
+    rows.extend({"path": key, **empty, "error": err} for key, err in errors)
+    return rows
+
+
+class JsonlSink:
+    """Append-only JSONL; commit() flushes and returns the byte offset to resume from."""
+
+    def __init__(self, path: Path, resume_state: Optional[dict] = None):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = open(path, "a+b")
+        if resume_state:
+            size = self.f.seek(0, os.SEEK_END)
+            if resume_state["offset"] > size:
+                self.f.close()
+                raise ValueError(f"{path} is shorter ({size} bytes) than its checkpoint "
+                                 f"({resume_state['offset']} bytes); rerun without resuming")
+            # Drop rows written after the last checkpoint
+            self.f.truncate(resume_state["offset"])
+        else:
+            self.f.truncate(0)
+        self.f.seek(0, os.SEEK_END)
+
+    def write(self, rows: List[dict]):
+        self.f.write("".join(json.dumps(r) + "\n" for r in rows).encode())
+
+    def commit(self) -> Optional[dict]:
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return {"offset": self.f.tell()}
+
+    def close(self) -> Optional[dict]:
+        state = self.commit()
+        self.f.close()
+        return state
+
+
+class ParquetSink:
+    """
+    Directory of part-NNNNN.parquet files, one per rows_per_part rows. The schema is fixed
+    so parts without error rows (all-null columns) still read back as one dataset.
+    """
+
+    def __init__(self, path: Path, resume_state: Optional[dict] = None, rows_per_part: int = 10000):
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from e
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.rows_per_part = rows_per_part
+        self.part = resume_state["part"] if resume_state else 0
+        missing = [i for i in range(self.part) if not (self.path / f"part-{i:05d}.parquet").exists()]
+        if missing:
+            raise ValueError(f"{path} is missing part(s) {missing} recorded in its checkpoint; "
+                             "rerun without resuming")
+        for stale in self.path.glob("part-*.parquet"):
+            if int(stale.stem.split("-")[1]) >= self.part:
+                stale.unlink()
+        self.buffer: List[dict] = []
+        self.schema = pyarrow.schema(
+            [("path", pyarrow.string()), ("label", pyarrow.string()), ("class_id", pyarrow.int64()),
+             ("confidence", pyarrow.float64())]
+            + [(f"prob_{c}", pyarrow.float64()) for c in CLASSES]
+            + [("error", pyarrow.string())]
+        )
+
+    def write(self, rows: List[dict]):
+        self.buffer.extend(rows)
+
+    def commit(self, force: bool = False) -> Optional[dict]:
+        """Write a part once enough rows are buffered; None means nothing was persisted."""
+        if not self.buffer or (len(self.buffer) < self.rows_per_part and not force):
+            return None
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.Table.from_pylist(self.buffer, schema=self.schema), self.path / f"part-{self.part:05d}.parquet")
+        self.part += 1
+        self.buffer = []
+        return {"part": self.part}
+
+    def close(self) -> Optional[dict]:
+        return self.commit(force=True)
+
+
+def _checkpoint_path(output: Path) -> Path:
+    return output.with_name(output.name + ".ckpt.json")
+
+
+def _save_checkpoint(path: Path, state: dict):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def score(
+    source: str,
+    output: str,
+    fmt: Optional[str] = None,
+    model_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    prefetch: Optional[int] = None,
+    resume: bool = True,
+) -> dict:
+    """
+    Score every image under source and write predictions to output.
+    fmt: jsonl or parquet (default: from output extension; parquet output is a directory).
+    resume: continue from output's checkpoint if it was written for the same source;
+        ValueError if the source's already processed items changed since, or the output no
+        longer holds what the checkpoint recorded (use resume=False). Starting over deletes
+        the old checkpoint.
+    batch_size defaults to the autotuned throughput profile's (else 64); workers to the
+    effective CPU count (cgroup quota aware).
+    Returns {"scored": n, "errors": n, "processed": n}.
+    """
+    from src.inference import load_keras_model
+    from src.threading_config import configure_threads, effective_cpus
+
+    out = Path(output)
+    fmt = fmt or ("parquet" if out.suffix == ".parquet" else "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    threads = configure_threads("throughput")
+    batch_size = batch_size or threads.get("batch_size", 64)
+    workers = workers or effective_cpus()
+    prefetch = prefetch or 2 * workers
+
+    ckpt_path = _checkpoint_path(out)
+    state = None
+    if resume and ckpt_path.exists():
+        with open(ckpt_path) as f:
+            state = json.load(f)
+        if (state.get("source") != str(source) or state.get("format") != fmt
+                or "keys_digest" not in state):
+            logger.warning(f"Checkpoint {ckpt_path} is for another source/format; starting over")
+            state = None
+    if state is None:
+        # A leftover checkpoint would later "resume" into the output this run rewrites
+        ckpt_path.unlink(missing_ok=True)
+    processed = state["processed"] if state else 0
+    keys_digest = state["keys_digest"] if state else ""
+    stats = {"scored": state["scored"] if state else 0, "errors": state["errors"] if state else 0}
+    if processed:
+        logger.info(f"Resuming after {processed} items")
+
+    # Verify the skipped prefix before the sink truncates anything
+    items = iter_source(source, skip=processed, skip_digest=keys_digest if state else None)
+    first = next(items, None)
+    items = chain([first], items) if first is not None else iter(())
+
+    model = load_keras_model(model_path)
+    sink = JsonlSink(out, state) if fmt == "jsonl" else ParquetSink(out, state)
+
+    def _checkpoint(sink_state):
+        if sink_state is not None:
+            _save_checkpoint(ckpt_path, {"source": str(source), "format": fmt, "processed": processed,
+                                         "keys_digest": keys_digest, **stats, **sink_state})
+
+    inflight = deque()
+    # spawn: workers only decode and must not inherit TensorFlow state from this process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        chunks = _batched(items, batch_size)
+        for chunk in islice(chunks, prefetch):
+            inflight.append(([key for key, _ in chunk], pool.submit(decode_batch, chunk)))
+        while inflight:
+            chunk_keys, fut = inflight.popleft()
+            next_chunk = next(chunks, None)
+            if next_chunk:
+                inflight.append(([key for key, _ in next_chunk], pool.submit(decode_batch, next_chunk)))
+            keys, batch, errors = fut.result()
+            probs = model.predict_on_batch(batch.astype(np.float32) / 255.0) if len(keys) else []
+            sink.write(prediction_rows(keys, np.asarray(probs), errors))
+            processed += len(chunk_keys)
+            keys_digest = chain_digest(keys_digest, chunk_keys)
+            stats["scored"] += len(keys)
+            stats["errors"] += len(errors)
+            _checkpoint(sink.commit())
+    _checkpoint(sink.close())
+    logger.info(f"Scored {stats['scored']} images ({stats['errors']} errors) -> {out}")
+    return {**stats, "processed": processed}
@@ -0,0 +1,126 @@
+"""
+Confidence-based model cascade.
+- A tiny fast model scores every image; the full model runs only where the fast
+  model's (temperature-calibrated) confidence is below a threshold
+- Temperature and threshold are fitted on validation data so that cascade accuracy
+  stays within max_accuracy_drop of the full model
+- The full model gets its own temperature, so escalated rows (and the full model on its
+  own) return probabilities on the same calibrated scale as the fast model's
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+CASCADE_CONFIG = "models/cascade.json"
+
+
+def apply_temperature(probs: np.ndarray, temperature: float) -> np.ndarray:
+    """Rescale softmax outputs as softmax(log(p) / T)."""
+    logits = np.log(np.clip(probs, 1e-7, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def fit_temperature(probs: np.ndarray, y: np.ndarray, grid: Optional[np.ndarray] = None) -> float:
+    """Temperature minimising validation NLL (grid search; T > 1 softens, T < 1 sharpens)."""
+    grid = grid if grid is not None else np.linspace(0.25, 5.0, 96)
+    y = np.asarray(y)
+
+    def _nll(t):
+        p = apply_temperature(probs, t)[np.arange(len(y)), y]
+        return -np.mean(np.log(np.clip(p, 1e-7, 1.0)))
+
+    return float(min(grid, key=_nll))
+
+
+def choose_threshold(
+    fast_probs: np.ndarray,
+    full_probs: np.ndarray,
+    y: np.ndarray,
+    max_accuracy_drop: float = 0.01,
+) -> dict:
+    """
+    Lowest confidence threshold (= fewest escalations) whose cascade accuracy is within
+    max_accuracy_drop of the full model. Images with fast confidence < threshold escalate.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    conf = fast_probs.max(axis=1)
+    fast_ok = fast_probs.argmax(axis=1) == y
+    full_ok = full_probs.argmax(axis=1) == y
+    full_acc = float(full_ok.mean())
+
+    # Escalating the k least confident images: accuracy = full on those, fast on the rest
+    order = np.argsort(conf, kind="stable")
+    gain = np.concatenate([[0], np.cumsum(full_ok[order].astype(int) - fast_ok[order].astype(int))])
+    acc = (fast_ok.sum() + gain) / n  # acc[k] after escalating the first k
+    # k must split at a confidence boundary so a threshold can express it
+    sorted_conf = conf[order]
+    valid = np.ones(n + 1, dtype=bool)
+    valid[1:n] = sorted_conf[1:] > sorted_conf[:-1]
+    candidates = np.where(valid & (acc >= full_acc - max_accuracy_drop))[0]
+    k = int(candidates[0]) if len(candidates) else n
+    threshold = float(sorted_conf[k]) if k < n else float("inf")
+    return {
+        "threshold": threshold,
+        "escalation_rate": k / n,
+        "cascade_accuracy": float(acc[k]),
+        "full_accuracy": full_acc,
+        "fast_accuracy": float(fast_ok.mean()),
+    }
+
+
+def cascade_predict(
+    batch: np.ndarray,
+    fast_fn: Callable[[np.ndarray], np.ndarray],
+    full_fn: Callable[[np.ndarray], np.ndarray],
+    threshold: float,
+    temperature: float = 1.0,
+    full_temperature: float = 1.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run fast_fn on batch, full_fn on the low-confidence rows; each model's output is
+    scaled by its own temperature. Returns (probs, escalated mask).
+    """
+    probs = apply_temperature(np.asarray(fast_fn(batch)), temperature)
+    escalate = probs.max(axis=1) < threshold
+    if escalate.any():
+        full = np.asarray(full_fn(batch[escalate]))
+        probs[escalate] = apply_temperature(full, full_temperature) if full_temperature != 1.0 else full
+    return probs, escalate
+
+
+def file_sha256(path: str) -> str:
+    """Identifies the full model a stored full_temperature was fitted for."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def full_model_temperature(config: Optional[dict], model_path: str) -> float:
+    """config's full_temperature if it was fitted for the model file at model_path, else 1.0."""
+    if not config or "full_temperature" not in config:
+        return 1.0
+    if config.get("full_model_sha256") != file_sha256(model_path):
+        return 1.0
+    return float(config["full_temperature"])
+
+
+def save_cascade_config(config: dict, path: str = CASCADE_CONFIG):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_cascade_config(path: str = CASCADE_CONFIG) -> Optional[dict]:
+    if not Path(path).exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,76 @@
+"""
+Adaptive concurrency limiting and request deadlines for the inference service.
+- AIMD limit: +1/limit per fast request, x backoff when latency exceeds the target
+- Requests over the limit are shed immediately (503) instead of queueing
+- X-Request-Deadline (unix epoch seconds) lets clients say when an answer is useless
+"""
+
+import threading
+import time
+from typing import Optional
+
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+    try_acquire() is non-blocking; every successful acquire must be paired with release().
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target_s: float = 0.5,
+        backoff: float = 0.9,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_s = latency_target_s
+        self.backoff = backoff
+        self._limit = float(initial_limit)
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.limit:
+                return False
+            self._inflight += 1
+            return True
+
+    def release(self, latency_s: Optional[float] = None):
+        """Free a slot; latency_s (None = request did not complete) adjusts the limit."""
+        with self._lock:
+            self._inflight -= 1
+            if latency_s is None:
+                return
+            if latency_s > self.latency_target_s:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+            elif self._inflight + 1 >= self.limit:
+                # Only grow when the limit was actually the constraint
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+
+def parse_deadline(value: Optional[str]) -> Optional[float]:
+    """Deadline header -> unix timestamp; None if absent. Raises ValueError if malformed."""
+    if value is None or value == "":
+        return None
+    deadline = float(value)
+    if deadline != deadline or deadline <= 0:
+        raise ValueError(f"Invalid {DEADLINE_HEADER}: {value!r}")
+    return deadline
+
+
+def deadline_expired(deadline: Optional[float], now: Optional[float] = None) -> bool:
+    return deadline is not None and (now if now is not None else time.time()) >= deadline
@@ -0,0 +1,208 @@
+"""
+Streaming evaluation shared by training and post-deploy tracking.
+- StreamingEvaluator consumes (labels, probabilities) batch by batch
+- Running confusion matrix, calibration bins (ECE) and score histograms (ROC/PR AUC)
+- Memory is O(bins), independent of dataset size
+- Plots are optional and use the Figure API so they can run in a background thread
+"""
+
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.preprocessing import CLASSES
+
+
+class StreamingEvaluator:
+    """
+    Binary classification metrics from batched predictions; class 1 (dog) is positive.
+    Accuracy/precision/recall/F1 are exact (sklearn, zero_division=0); ROC/PR AUC are
+    computed on score_bins equal-width score bins.
+    """
+
+    def __init__(self, num_classes: int = 2, calibration_bins: int = 15, score_bins: int = 10000):
+        self.num_classes = num_classes
+        self.calibration_bins = calibration_bins
+        self.score_bins = score_bins
+        self.confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+        self.cal_count = np.zeros(calibration_bins, dtype=np.int64)
+        self.cal_confidence = np.zeros(calibration_bins, dtype=np.float64)
+        self.cal_correct = np.zeros(calibration_bins, dtype=np.int64)
+        self.pos_hist = np.zeros(score_bins, dtype=np.int64)
+        self.neg_hist = np.zeros(score_bins, dtype=np.int64)
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.confusion.sum())
+
+    def update(self, y_true, probs) -> "StreamingEvaluator":
+        """Add a batch: y_true (N,) int labels, probs (N, num_classes) probabilities."""
+        y_true = np.asarray(y_true, dtype=np.int64)
+        probs = np.asarray(probs, dtype=np.float64)
+        if len(y_true) == 0:
+            return self
+        y_pred = probs.argmax(axis=1)
+        np.add.at(self.confusion, (y_true, y_pred), 1)
+
+        conf = probs.max(axis=1)
+        cal_idx = np.minimum((conf * self.calibration_bins).astype(np.int64), self.calibration_bins - 1)
+        self.cal_count += np.bincount(cal_idx, minlength=self.calibration_bins)
+        self.cal_confidence += np.bincount(cal_idx, weights=conf, minlength=self.calibration_bins)
+        self.cal_correct += np.bincount(cal_idx, weights=(y_pred == y_true), minlength=self.calibration_bins).astype(np.int64)
+
+        score = probs[:, 1]
+        score_idx = np.clip((score * self.score_bins).astype(np.int64), 0, self.score_bins - 1)
+        self.pos_hist += np.bincount(score_idx[y_true == 1], minlength=self.score_bins)
+        self.neg_hist += np.bincount(score_idx[y_true != 1], minlength=self.score_bins)
+        return self
+
+    def merge(self, other: "StreamingEvaluator") -> "StreamingEvaluator":
+        for name in ("confusion", "cal_count", "cal_confidence", "cal_correct", "pos_hist", "neg_hist"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def expected_calibration_error(self) -> float:
+        n = self.cal_count.sum()
+        if n == 0:
+            return 0.0
+        nonempty = self.cal_count > 0
+        gap = np.abs(self.cal_correct[nonempty] - self.cal_confidence[nonempty])
+        return float(gap.sum() / n)
+
+    def roc_curve(self):
+        """(fpr, tpr) from the highest score bin down, starting at (0, 0)."""
+        tp = np.concatenate([[0], np.cumsum(self.pos_hist[::-1])])
+        fp = np.concatenate([[0], np.cumsum(self.neg_hist[::-1])])
+        return fp / max(fp[-1], 1), tp / max(tp[-1], 1)
+
+    def pr_curve(self):
+        """(precision, recall) per score-bin threshold, highest threshold first."""
+        tp = np.cumsum(self.pos_hist[::-1])
+        fp = np.cumsum(self.neg_hist[::-1])
+        keep = (tp + fp) > 0
+        tp, fp = tp[keep], fp[keep]
+        return tp / (tp + fp), tp / max(tp[-1] if len(tp) else 0, 1)
+
+    def roc_auc(self) -> float:
+        if self.pos_hist.sum() == 0 or self.neg_hist.sum() == 0:
+            return float("nan")
+        fpr, tpr = self.roc_curve()
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def average_precision(self) -> float:
+        """PR AUC as sklearn's average precision: sum of (R_n - R_{n-1}) * P_n."""
+        if self.pos_hist.sum() == 0:
+            return float("nan")
+        precision, recall = self.pr_curve()
+        return float(np.sum(np.diff(np.concatenate([[0], recall])) * precision))
+
+    def result(self) -> Dict:
+        cm = self.confusion
+        n = cm.sum()
+        tp, fp, fn = cm[1, 1], cm[0, 1], cm[1, 0]
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {
+            "accuracy": float(np.trace(cm) / n) if n else 0.0,
+            "precision": float(precision),
+            "recall": float(recall),
+            "f1": float(f1),
+            "ece": self.expected_calibration_error(),
+            "roc_auc": self.roc_auc(),
+            "pr_auc": self.average_precision(),
+            "n_samples": int(n),
+            "confusion_matrix": cm.tolist(),
+        }
+
+
+def evaluate_batched(
+    predict_fn: Callable[[np.ndarray], np.ndarray],
+    X,
+    y,
+    batch_size: int = 256,
+    evaluator: Optional[StreamingEvaluator] = None,
+) -> StreamingEvaluator:
+    """
+    Run predict_fn over X in batches (X may be a memmap larger than RAM) and
+    accumulate into evaluator. Only one batch of inputs/probabilities is held at a time.
+    """
+    evaluator = evaluator or StreamingEvaluator()
+    for start in range(0, len(y), batch_size):
+        batch = np.asarray(X[start:start + batch_size])
+        evaluator.update(np.asarray(y[start:start + batch_size]), predict_fn(batch))
+    return evaluator
+
+
+def save_plots(
+    evaluator: StreamingEvaluator,
+    history: Optional[Dict[str, List[float]]] = None,
+    out_dir: str = "logs",
+) -> List[str]:
+    """Confusion matrix, ROC and (if history is given) loss curve PNGs. Returns the paths."""
+    from matplotlib.figure import Figure
+    try:
+        import seaborn as sns
+    except ImportError:
+        sns = None
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    paths = []
+
+    cm = evaluator.confusion
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    if sns is not None:
+        sns.heatmap(cm, annot=True, fmt="d", cmap="Blues", ax=ax, xticklabels=CLASSES, yticklabels=CLASSES)
+    else:
+        ax.imshow(cm, cmap="Blues")
+        ax.set_xticks(range(len(CLASSES)))
+        ax.set_yticks(range(len(CLASSES)))
+        ax.set_xticklabels(CLASSES)
+        ax.set_yticklabels(CLASSES)
+        for i in range(cm.shape[0]):
+            for j in range(cm.shape[1]):
+                ax.text(j, i, str(cm[i, j]), ha="center", va="center")
+    ax.set_title("Confusion Matrix")
+    fig.tight_layout()
+    paths.append(str(Path(out_dir) / "confusion_matrix.png"))
+    fig.savefig(paths[-1], dpi=100)
+
+    fpr, tpr = evaluator.roc_curve()
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.plot(fpr, tpr, label=f"AUC={evaluator.roc_auc():.3f}")
+    ax.plot([0, 1], [0, 1], linestyle="--", color="grey")
+    ax.set_xlabel("False positive rate")
+    ax.set_ylabel("True positive rate")
+    ax.set_title("ROC Curve")
+    ax.legend()
+    fig.tight_layout()
+    paths.append(str(Path(out_dir) / "roc_curve.png"))
+    fig.savefig(paths[-1], dpi=100)
+
+    if history:
+        fig = Figure(figsize=(6, 4))
+        ax = fig.subplots()
+        ax.plot(history["loss"], label="train")
+        ax.plot(history["val_loss"], label="val")
+        ax.set_title("Loss Curve")
+        ax.legend()
+        fig.tight_layout()
+        paths.append(str(Path(out_dir) / "loss_curve.png"))
+        fig.savefig(paths[-1], dpi=100)
+    return paths
+
+
+def save_plots_async(evaluator: StreamingEvaluator, history=None, out_dir: str = "logs"):
+    """Render plots in a background thread. Returns (thread, paths list filled on completion)."""
+    paths: List[str] = []
+    thread = threading.Thread(
+        target=lambda: paths.extend(save_plots(evaluator, history, out_dir)),
+        name="eval-plots",
+        daemon=True,
+    )
+    thread.start()
+    return thread, paths
@@ -0,0 +1,32 @@
+"""
+Model loading shared by the API service and offline scoring.
+Looks for models/model.h5, then models/model.keras.
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATHS = (Path("models/model.h5"), Path("models/model.keras"))
+
+
+def resolve_model_path(model_path: Optional[str] = None) -> Optional[Path]:
+    """Explicit path if given, else the first existing default; None if nothing exists."""
+    candidates = (Path(model_path),) if model_path else MODEL_PATHS
+    for path in candidates:
+        if path.exists():
+            return path
+    return None
+
+
+def load_keras_model(model_path: Optional[str] = None):
+    """Load the Keras model; raises FileNotFoundError if no model file exists."""
+    import tensorflow as tf
+
+    path = resolve_model_path(model_path)
+    if path is None:
+        searched = model_path or " or ".join(str(p) for p in MODEL_PATHS)
+        raise FileNotFoundError(f"No model file found at {searched}")
+    return tf.keras.models.load_model(str(path))
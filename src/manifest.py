@@ -0,0 +1,156 @@
+"""
+Dataset manifest: one record per image under a raw data directory.
+- path (relative), sha256, size, mtime_ns, width, height, label, split, valid
+- Built once in parallel; later runs skip files whose size and mtime are unchanged, and
+  files whose mtime changed (e.g. after a fresh git/DVC checkout) are only re-hashed:
+  the stored record is reused when sha256 and size still match, so only new or
+  modified content is decoded again
+- root is stored relative to the manifest file, so the manifest stays valid in any
+  checkout that keeps the same layout
+- dedupe() drops byte-identical copies across splits (train > val > test) to avoid leakage
+"""
+
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+SPLITS = ("train", "val", "test")
+DEFAULT_MANIFEST = "data/processed/manifest.json"
+
+
+def _label_from_dir(name: str) -> int:
+    return 1 if "dog" in name.lower() else 0
+
+
+def _scan(root: Path) -> List[os.DirEntry]:
+    """All image files under root (recursive), sorted by relative path."""
+    found, stack = [], [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif Path(entry.name).suffix.lower() in IMAGE_EXTENSIONS:
+                    found.append(entry)
+    return sorted(found, key=lambda e: e.path)
+
+
+def inspect_file(root: str, rel_path: str, previous: Optional[dict] = None) -> dict:
+    """
+    Hash, stat, decode-check and label one file. Runs in a worker process.
+    previous: the stored record; reused (with the new mtime) if sha256 and size match.
+    """
+    path = Path(root) / rel_path
+    data = path.read_bytes()
+    st = path.stat()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if previous and previous["sha256"] == sha256 and previous["size"] == st.st_size:
+        return {**previous, "mtime_ns": st.st_mtime_ns}
+    parts = Path(rel_path).parts
+    record = {
+        "path": rel_path,
+        "sha256": sha256,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "width": None,
+        "height": None,
+        "label": _label_from_dir(parts[-2]) if len(parts) > 1 else None,
+        "split": parts[0] if len(parts) > 2 and parts[0] in SPLITS else None,
+        "valid": False,
+        "error": None,
+    }
+    try:
+        from io import BytesIO
+        with Image.open(BytesIO(data)) as img:
+            img.load()
+            record["width"], record["height"] = img.size
+        record["valid"] = True
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def _root_key(data_dir: str, manifest_path: str) -> str:
+    """data_dir relative to the manifest's directory (POSIX separators)."""
+    rel = os.path.relpath(Path(data_dir).resolve(), Path(manifest_path).resolve().parent)
+    return Path(rel).as_posix()
+
+
+def load_manifest(manifest_path: str = DEFAULT_MANIFEST, data_dir: Optional[str] = None) -> List[dict]:
+    """Stored entries; empty if missing or built for a different data_dir."""
+    path = Path(manifest_path)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        stored = json.load(f)
+    if data_dir is not None and stored.get("root") != _root_key(data_dir, manifest_path):
+        return []
+    return stored["entries"]
+
+
+def update_manifest(
+    data_dir: str = "data/raw/cats_vs_dogs",
+    manifest_path: str = DEFAULT_MANIFEST,
+    workers: Optional[int] = None,
+) -> List[dict]:
+    """
+    Bring the manifest in line with data_dir and return its entries.
+    Only new files and files whose size or mtime changed are re-read; of those, only
+    files whose content changed are decoded again.
+    """
+    root = Path(data_dir)
+    if not root.exists():
+        raise FileNotFoundError(f"Data directory not found: {data_dir}")
+    previous = {e["path"]: e for e in load_manifest(manifest_path, data_dir)}
+
+    entries, stale = {}, []
+    for entry in _scan(root):
+        rel = str(Path(entry.path).relative_to(root))
+        st = entry.stat()
+        old = previous.get(rel)
+        if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+            entries[rel] = old
+        else:
+            stale.append(rel)
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for record in pool.map(inspect_file, [str(root)] * len(stale), stale,
+                                   [previous.get(rel) for rel in stale], chunksize=64):
+                entries[record["path"]] = record
+    removed = len(previous.keys() - entries.keys())
+    logger.info(f"Manifest: {len(entries)} files, {len(stale)} (re)indexed, {removed} removed")
+
+    result = [entries[k] for k in sorted(entries)]
+    if stale or removed:
+        out = Path(manifest_path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"root": _root_key(data_dir, manifest_path), "entries": result}, f)
+        os.replace(tmp, out)
+    return result
+
+
+def dedupe(entries: Iterable[dict]) -> List[dict]:
+    """
+    Keep one entry per sha256. Across splits the copy in the earliest split
+    (train, then val, then test) wins, so test never repeats a training image.
+    """
+    order = {s: i for i, s in enumerate(SPLITS)}
+    best = {}
+    for e in entries:
+        rank = (order.get(e["split"], len(SPLITS)), e["path"])
+        if e["sha256"] not in best or rank < best[e["sha256"]][0]:
+            best[e["sha256"]] = (rank, e)
+    kept = [e for _, e in best.values()]
+    return sorted(kept, key=lambda e: e["path"])
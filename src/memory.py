@@ -0,0 +1,109 @@
+"""
+Memory instrumentation for the serving process.
+- Current and peak RSS
+- Live PIL images / numpy arrays created by the request path (weak references)
+- tracemalloc snapshots: top allocation sites, and growth since tracing started
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+import weakref
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACKED_KINDS = ("pil_image", "ndarray")
+
+_live: Dict[str, int] = {kind: 0 for kind in TRACKED_KINDS}
+_live_lock = threading.Lock()
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc; falls back to peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size since process start (0 where unsupported)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def _release(kind: str):
+    with _live_lock:
+        _live[kind] -= 1
+
+
+def track(obj, kind: str):
+    """Count obj as live until it is garbage collected. Returns obj."""
+    with _live_lock:
+        _live[kind] += 1
+    weakref.finalize(obj, _release, kind)
+    return obj
+
+
+def live_counts() -> Dict[str, int]:
+    with _live_lock:
+        return dict(_live)
+
+
+def start_tracing(nframes: int = 10):
+    """Start tracemalloc and remember a baseline snapshot for growth reports."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(nframes)
+    _baseline = tracemalloc.take_snapshot()
+
+
+def stop_tracing():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+
+
+def traced_bytes() -> int:
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def top_allocations(limit: int = 20, key_type: str = "lineno", growth: bool = False) -> List[dict]:
+    """
+    Largest allocation sites from a fresh snapshot (growth=True: compared to the
+    baseline taken by start_tracing). Empty if tracemalloc is not running.
+    """
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    if growth and _baseline is not None:
+        stats = snapshot.compare_to(_baseline, key_type)
+        return [{"site": str(s.traceback), "size_bytes": s.size, "size_diff_bytes": s.size_diff,
+                 "count": s.count, "count_diff": s.count_diff} for s in stats[:limit]]
+    return [{"site": str(s.traceback), "size_bytes": s.size, "count": s.count}
+            for s in snapshot.statistics(key_type)[:limit]]
+
+
+def memory_report(limit: int = 20, growth: bool = False) -> dict:
+    return {
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "live_objects": live_counts(),
+        "tracemalloc": {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": traced_bytes(),
+            "top": top_allocations(limit, growth=growth),
+        },
+    }
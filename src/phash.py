@@ -0,0 +1,95 @@
+"""
+Perceptual-hash near-duplicate cache for predictions.
+- dhash(): 64-bit difference hash of the already-resized inference array, so resized,
+  re-compressed or EXIF-stripped copies of a photo hash within a few bits of each other
+- NearDuplicateIndex: bounded LRU with multi-index hashing; a hash is split into
+  max_distance + 1 chunks, so any match within max_distance shares at least one chunk exactly
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+HASH_BITS = 64
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def dhash(img_array: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash of an (H, W, 3) or (1, H, W, 3) image: block-mean grayscale
+    downsample to hash_size x (hash_size + 1), one bit per horizontal neighbour comparison.
+    """
+    img = np.asarray(img_array)
+    if img.ndim == 4:
+        img = img[0]
+    gray = img.astype(np.float32) @ _LUMA
+    h, w = gray.shape
+    rows = np.linspace(0, h, hash_size + 1, dtype=np.int64)[:-1]
+    cols = np.linspace(0, w, hash_size + 2, dtype=np.int64)[:-1]
+    small = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    small /= np.outer(np.diff(np.append(rows, h)), np.diff(np.append(cols, w)))
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """Thread-safe bounded map from 64-bit hash to value, with Hamming-radius lookup."""
+
+    def __init__(self, capacity: int = 10000, max_distance: int = 4):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance must be in [0, {HASH_BITS})")
+        self.capacity = capacity
+        self.max_distance = max_distance
+        n_chunks = max_distance + 1
+        bounds = np.linspace(0, HASH_BITS, n_chunks + 1, dtype=np.int64)
+        self._chunks: List[Tuple[int, int]] = [
+            (int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in self._chunks]
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, h: int):
+        return [(h >> shift) & mask for shift, mask in self._chunks]
+
+    def lookup(self, h: int) -> Optional[Tuple[Any, int]]:
+        """(value, distance) of the closest entry within max_distance, else None."""
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._tables, self._keys(h)):
+                candidates |= table.get(key, set())
+            best, best_dist = None, self.max_distance + 1
+            for cand in candidates:
+                dist = hamming(h, cand)
+                if dist < best_dist:
+                    best, best_dist = cand, dist
+            if best is None:
+                return None
+            self._entries.move_to_end(best)
+            return self._entries[best], best_dist
+
+    def insert(self, h: int, value: Any):
+        with self._lock:
+            if h in self._entries:
+                self._entries[h] = value
+                self._entries.move_to_end(h)
+                return
+            self._entries[h] = value
+            for table, key in zip(self._tables, self._keys(h)):
+                table.setdefault(key, set()).add(h)
+            while len(self._entries) > self.capacity:
+                old, _ = self._entries.popitem(last=False)
+                for table, key in zip(self._tables, self._keys(old)):
+                    bucket = table[key]
+                    bucket.discard(old)
+                    if not bucket:
+                        del table[key]
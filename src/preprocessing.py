@@ -13,6 +13,8 @@ from typing import Tuple, List, Optional
 import numpy as np
 from PIL import Image
 
+from src import memory
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -34,40 +36,45 @@ def load_dataset(
     data_dir: str = "data/raw/cats_vs_dogs",
     splits: Tuple[float, float, float] = (0.8, 0.1, 0.1),
     seed: int = 42,
+    manifest_path: Optional[str] = None,
 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
     Load images from train/val/test folders. If not present, create from single folder.
+    Files are listed from the dataset manifest (src/manifest.py), which is updated
+    incrementally; invalid images and cross-split duplicates are dropped.
     Returns: X_train, y_train, X_val, y_val, X_test, y_test
     """
+    from src.manifest import DEFAULT_MANIFEST, dedupe, update_manifest
+
     data_path = Path(data_dir)
     if not data_path.exists():
         raise FileNotFoundError(f"Data directory not found: {data_dir}")
 
     # Support structure: data_dir/train/cats/, data_dir/train/dogs/, etc.
-    train_dir = data_path / "train"
-    val_dir = data_path / "val"
-    test_dir = data_path / "test"
-
-    def _collect_from_folder(folder: Path) -> Tuple[List[np.ndarray], List[int]]:
+    entries = update_manifest(data_dir, manifest_path or DEFAULT_MANIFEST)
+    valid = [e for e in entries if e["valid"] and e["split"] is not None]
+    for e in entries:
+        if not e["valid"]:
+            logger.warning(f"Skip {e['path']}: {e['error']}")
+    unique = dedupe(valid)
+    if len(unique) < len(valid):
+        logger.info(f"Dropped {len(valid) - len(unique)} duplicate images")
+
+    def _collect_from_split(split: str) -> Tuple[List[np.ndarray], List[int]]:
         X, y = [], []
-        if not folder.exists():
-            return X, y
-        for cls_dir in folder.iterdir():
-            if not cls_dir.is_dir():
+        for e in unique:
+            if e["split"] != split:
                 continue
-            label = 1 if "dog" in cls_dir.name.lower() else 0
-            for fp in list(cls_dir.glob("*.jpg")) + list(cls_dir.glob("*.jpeg")) + list(cls_dir.glob("*.png")):
-                try:
-                    arr = load_image(str(fp))
-                    X.append(arr)
-                    y.append(label)
-                except Exception as e:
-                    logger.warning(f"Skip {fp}: {e}")
+            try:
+                X.append(load_image(str(data_path / e["path"])))
+                y.append(e["label"])
+            except Exception as err:
+                logger.warning(f"Skip {e['path']}: {err}")
         return X, y
 
-    X_train, y_train = _collect_from_folder(train_dir)
-    X_val, y_val = _collect_from_folder(val_dir)
-    X_test, y_test = _collect_from_folder(test_dir)
+    X_train, y_train = _collect_from_split("train")
+    X_val, y_val = _collect_from_split("val")
+    X_test, y_test = _collect_from_split("test")
 
     if len(X_train) == 0:
         raise ValueError("No images found. Run scripts/download_data.py first.")
@@ -118,17 +125,19 @@ def augment_image(img: np.ndarray) -> np.ndarray:
     return img
 
 
-def preprocess_for_inference(img_input, size: Tuple[int, int] = IMG_SIZE) -> np.ndarray:
+def decode_image(img_input, size: Tuple[int, int] = IMG_SIZE) -> np.ndarray:
     """
-    Preprocess image for inference.
+    Decode and resize an image without normalising.
     img_input: file path (str), bytes, or numpy array [H,W,3]
-    Returns: (1, H, W, 3) float32 in [0,1]
+    Returns: (H, W, 3) uint8
+    Every intermediate PIL image (opened, converted, resized) is counted by src.memory.
     """
-    if isinstance(img_input, (str, Path)):
-        img = Image.open(img_input).convert("RGB")
-    elif isinstance(img_input, bytes):
-        from io import BytesIO
-        img = Image.open(BytesIO(img_input)).convert("RGB")
+    if isinstance(img_input, (str, Path, bytes)):
+        if isinstance(img_input, bytes):
+            from io import BytesIO
+            img_input = BytesIO(img_input)
+        with memory.track(Image.open(img_input), "pil_image") as opened:
+            img = opened.convert("RGB")
     elif isinstance(img_input, np.ndarray):
         if img_input.ndim == 2:
             img_input = np.stack([img_input] * 3, axis=-1)
@@ -139,6 +148,16 @@ def preprocess_for_inference(img_input, size: Tuple[int, int] = IMG_SIZE) -> np.
         )
     else:
         raise ValueError("img_input must be path, bytes, or numpy array")
-    img = img.resize(size, Image.BILINEAR)
-    arr = np.array(img, dtype=np.float32) / 255.0
-    return arr[np.newaxis, ...]  # (1, H, W, 3)
+    memory.track(img, "pil_image")
+    img = memory.track(img.resize(size, Image.BILINEAR), "pil_image")
+    return np.asarray(img, dtype=np.uint8)
+
+
+def preprocess_for_inference(img_input, size: Tuple[int, int] = IMG_SIZE) -> np.ndarray:
+    """
+    Preprocess image for inference.
+    img_input: file path (str), bytes, or numpy array [H,W,3]
+    Returns: (1, H, W, 3) float32 in [0,1]
+    """
+    arr = decode_image(img_input, size).astype(np.float32) / 255.0
+    return memory.track(arr[np.newaxis, ...], "ndarray")  # (1, H, W, 3)
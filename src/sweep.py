@@ -0,0 +1,342 @@
+"""
+Hyperparameter sweeps over build_cnn and training parameters.
+- Strategies: grid, random, successive halving
+- Trials run in parallel worker processes
+- Dataset is unpacked once to .npy files and memory-mapped by every worker; training
+  reads it batch by batch, so workers share the mapped pages instead of copying the arrays
+- Each trial is logged as a nested MLflow run under one parent sweep run
+"""
+
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.threading_config import effective_cpus
+
+try:
+    import mlflow
+    MLFLOW_AVAILABLE = True
+except ImportError as e:
+    logging.warning(f"MLflow not available: {e}. Sweeping without experiment tracking.")
+    MLFLOW_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("grid", "random", "halving")
+DATASET_KEYS = ("X_train", "y_train", "X_val", "y_val", "X_test", "y_test")
+STAMP_FILE = "source.json"
+
+# build_cnn keyword arguments; everything else in a config is a training parameter
+BUILD_PARAMS = ("filters", "dense_units", "dropout", "optimizer", "learning_rate")
+TRAIN_PARAMS = ("batch_size",)
+
+DEFAULT_SEARCH_SPACE = {
+    "filters": [(32, 64, 64), (16, 32, 32), (32, 64, 128)],
+    "dense_units": [32, 64, 128],
+    "dropout": [0.3, 0.5],
+    "optimizer": ["adam", "rmsprop"],
+    "learning_rate": [1e-3, 3e-4],
+    "batch_size": [32, 64],
+}
+
+# Per-process dataset handle, set by _init_worker
+_DATA: Dict[str, np.ndarray] = {}
+
+
+def grid_configs(space: Dict[str, list]) -> List[dict]:
+    """All combinations of the search space, in a stable order."""
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_configs(space: Dict[str, list], n_trials: int, seed: int = 42) -> List[dict]:
+    """n_trials distinct configs sampled uniformly from the grid."""
+    grid = grid_configs(space)
+    rng = random.Random(seed)
+    return rng.sample(grid, min(n_trials, len(grid)))
+
+
+def halving_rungs(min_epochs: int, max_epochs: int, eta: int = 3) -> List[int]:
+    """Epoch budgets for successive halving, e.g. (1, 9, 3) -> [1, 3, 9]."""
+    if eta < 2:
+        raise ValueError("eta must be >= 2")
+    rungs = [max_epochs]
+    while rungs[-1] // eta >= max(1, min_epochs):
+        rungs.append(rungs[-1] // eta)
+    return sorted(set(rungs))
+
+
+def split_config(config: dict):
+    """(build_cnn kwargs, train_and_track kwargs) for a trial config."""
+    return ({k: config[k] for k in BUILD_PARAMS if k in config},
+            {k: config[k] for k in TRAIN_PARAMS if k in config})
+
+
+def select_survivors(results: List[dict], eta: int = 3) -> List[int]:
+    """Trial ids of the top 1/eta results by val_accuracy (at least one survives)."""
+    ranked = sorted(results, key=lambda r: r["val_accuracy"], reverse=True)
+    keep = max(1, len(ranked) // eta)
+    return [r["trial_id"] for r in ranked[:keep]]
+
+
+def _source_stamp(data_path: str) -> dict:
+    src = Path(data_path).resolve()
+    stat = src.stat()
+    return {"source": str(src), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def prepare_shared_dataset(
+    data_path: str = "data/processed/dataset.npz",
+    cache_dir: Optional[str] = None,
+) -> Path:
+    """
+    Unpack the compressed NPZ into one .npy per array so it can be memory-mapped.
+    cache_dir defaults to <npz dir>/<stem>.mmap/. Skipped when the cache's stamp
+    (resolved source path, size, mtime_ns) matches the NPZ; rebuilt otherwise.
+    """
+    cache = Path(cache_dir) if cache_dir else Path(data_path).with_suffix(".mmap")
+    stamp_path = cache / STAMP_FILE
+    stamp = _source_stamp(data_path)
+    if stamp_path.exists() and all((cache / f"{k}.npy").exists() for k in DATASET_KEYS):
+        with open(stamp_path) as f:
+            if json.load(f) == stamp:
+                return cache
+    cache.mkdir(parents=True, exist_ok=True)
+    stamp_path.unlink(missing_ok=True)  # an interrupted rebuild must not look fresh
+    data = np.load(data_path)
+    for key in DATASET_KEYS:
+        np.save(cache / f"{key}.npy", data[key])
+    with open(stamp_path, "w") as f:
+        json.dump(stamp, f)
+    logger.info(f"Unpacked {data_path} to {cache} for memory-mapping")
+    return cache
+
+
+def load_shared_dataset(cache_dir: str) -> Dict[str, np.ndarray]:
+    """Open the unpacked dataset read-only; pages are shared across processes by the OS."""
+    return {key: np.load(Path(cache_dir) / f"{key}.npy", mmap_mode="r") for key in DATASET_KEYS}
+
+
+class MemmapBatches:
+    """
+    (X, y) batches sliced from memory-mapped arrays on demand, so a worker only holds
+    one batch in its heap. shuffle=True draws a new sample order each epoch.
+    """
+
+    def __init__(self, X, y, batch_size: int, shuffle: bool = False, seed: int = 0):
+        self.X, self.y = X, y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = np.arange(len(y))
+        self.on_epoch_end()
+
+    def __len__(self) -> int:
+        return -(-len(self.y) // self.batch_size)
+
+    def __getitem__(self, i: int):
+        # Sorted indices keep reads close to sequential within the mapped file
+        idx = np.sort(self._order[i * self.batch_size:(i + 1) * self.batch_size])
+        return np.asarray(self.X[idx]), np.asarray(self.y[idx])
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self._order)
+
+
+def _keras_sequence(batches: MemmapBatches):
+    """Wrap MemmapBatches as a keras Sequence; fit() on raw arrays would copy them whole."""
+    import tensorflow as tf
+
+    class _Sequence(tf.keras.utils.Sequence):
+        def __len__(self):
+            return len(batches)
+
+        def __getitem__(self, i):
+            return batches[i]
+
+        def on_epoch_end(self):
+            batches.on_epoch_end()
+
+    return _Sequence()
+
+
+def _init_worker(cache_dir: str, threads: int):
+    from src.threading_config import apply_thread_settings, default_settings
+    global _DATA
+    apply_thread_settings(default_settings(threads))
+    _DATA = load_shared_dataset(cache_dir)
+
+
+def _run_trial(task: dict) -> dict:
+    """
+    Train one trial up to task["epochs"], resuming from its checkpoint if it
+    already ran in an earlier rung. Runs inside a worker process.
+    """
+    import tensorflow as tf
+    from src.training import build_cnn
+
+    config = task["config"]
+    checkpoint = Path(task["checkpoint"])
+    build_kwargs, train_kwargs = split_config(config)
+    if checkpoint.exists():
+        model = tf.keras.models.load_model(str(checkpoint))
+    else:
+        model = build_cnn(**build_kwargs)
+
+    run_id = task.get("run_id")
+    if MLFLOW_AVAILABLE and task.get("parent_run_id"):
+        if run_id:
+            mlflow.start_run(run_id=run_id)
+        else:
+            mlflow.start_run(
+                experiment_id=task["experiment_id"],
+                run_name=f"trial-{task['trial_id']:03d}",
+                tags={"mlflow.parentRunId": task["parent_run_id"]},
+            )
+            mlflow.log_params({k: str(v) for k, v in config.items()})
+        run_id = mlflow.active_run().info.run_id
+
+    batch_size = train_kwargs.get("batch_size", 32)
+    train = MemmapBatches(_DATA["X_train"], _DATA["y_train"], batch_size, shuffle=True,
+                          seed=task["trial_id"] * 1000 + task["initial_epoch"])
+    val = MemmapBatches(_DATA["X_val"], _DATA["y_val"], batch_size)
+    start = time.perf_counter()
+    history = model.fit(
+        _keras_sequence(train),
+        validation_data=_keras_sequence(val),
+        initial_epoch=task["initial_epoch"],
+        epochs=task["epochs"],
+        verbose=0,
+    )
+    model.save(str(checkpoint))
+    val_acc = float(history.history["val_accuracy"][-1])
+
+    if MLFLOW_AVAILABLE and run_id:
+        for i, acc in enumerate(history.history["val_accuracy"]):
+            mlflow.log_metric("val_accuracy", acc, step=task["initial_epoch"] + i + 1)
+        mlflow.log_metric("train_seconds", time.perf_counter() - start, step=task["epochs"])
+        mlflow.end_run()
+
+    return {
+        "trial_id": task["trial_id"],
+        "config": config,
+        # Ready for train_and_track(model_params=..., **train_params)
+        "model_params": build_kwargs,
+        "train_params": train_kwargs,
+        "epochs": task["epochs"],
+        "val_accuracy": val_acc,
+        "run_id": run_id,
+        "checkpoint": str(checkpoint),
+    }
+
+
+def run_sweep(
+    strategy: str = "random",
+    data_path: str = "data/processed/dataset.npz",
+    space: Optional[Dict[str, list]] = None,
+    n_trials: int = 8,
+    min_epochs: int = 1,
+    max_epochs: int = 3,
+    eta: int = 3,
+    workers: int = 2,
+    prune: bool = True,
+    seed: int = 42,
+    experiment_name: str = "cats-vs-dogs",
+    work_dir: str = "models/sweep",
+) -> List[dict]:
+    """
+    Run a sweep and return the final result of every trial, best first.
+
+    grid/random: every config trains to max_epochs; with prune=True all configs
+    first train min_epochs and only the top 1/eta continue.
+    halving: successive halving over halving_rungs(min_epochs, max_epochs, eta).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {STRATEGIES}")
+    space = space or DEFAULT_SEARCH_SPACE
+    if strategy == "grid":
+        configs = grid_configs(space)
+    else:
+        configs = random_configs(space, n_trials, seed)
+
+    if strategy == "halving":
+        rungs = halving_rungs(min_epochs, max_epochs, eta)
+    elif prune and min_epochs < max_epochs:
+        rungs = [min_epochs, max_epochs]
+    else:
+        rungs = [max_epochs]
+
+    cache_dir = prepare_shared_dataset(data_path)
+    run_dir = Path(work_dir) / time.strftime("%Y%m%d-%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+
+    parent_run_id = experiment_id = None
+    if MLFLOW_AVAILABLE:
+        mlflow.set_experiment(experiment_name)
+        parent = mlflow.start_run(run_name=f"sweep-{strategy}")
+        parent_run_id = parent.info.run_id
+        experiment_id = parent.info.experiment_id
+        mlflow.log_params({
+            "strategy": strategy,
+            "n_configs": len(configs),
+            "rungs": rungs,
+            "eta": eta,
+            "workers": workers,
+        })
+
+    latest = {}
+    active = list(range(len(configs)))
+    logger.info(f"Sweep {strategy}: {len(configs)} configs, rungs={rungs}, workers={workers}")
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            # Split the CPU quota between workers instead of each sizing pools to the host
+            initargs=(str(cache_dir), max(1, effective_cpus() // workers)),
+        ) as pool:
+            prev_epochs = 0
+            for rung_idx, epochs in enumerate(rungs):
+                tasks = [{
+                    "trial_id": i,
+                    "config": configs[i],
+                    "initial_epoch": prev_epochs,
+                    "epochs": epochs,
+                    "checkpoint": str(run_dir / f"trial_{i:03d}.h5"),
+                    "run_id": latest.get(i, {}).get("run_id"),
+                    "parent_run_id": parent_run_id,
+                    "experiment_id": experiment_id,
+                } for i in active]
+                rung_results = list(pool.map(_run_trial, tasks))
+                for r in rung_results:
+                    latest[r["trial_id"]] = r
+                if rung_idx < len(rungs) - 1:
+                    active = select_survivors(rung_results, eta)
+                    logger.info(f"Rung {epochs} epochs: kept {len(active)}/{len(rung_results)} trials")
+                prev_epochs = epochs
+    finally:
+        results = sorted(latest.values(), key=lambda r: (r["epochs"], r["val_accuracy"]), reverse=True)
+        if MLFLOW_AVAILABLE:
+            if results:
+                mlflow.log_metric("best_val_accuracy", results[0]["val_accuracy"])
+                mlflow.log_params({f"best_{k}": str(v) for k, v in results[0]["config"].items()})
+            mlflow.end_run()
+
+    out_path = Path("logs/sweep_results.json")
+    out_path.parent.mkdir(exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    if results:
+        logger.info(f"Best trial {results[0]['trial_id']}: val_acc={results[0]['val_accuracy']:.4f} "
+                    f"config={results[0]['config']}")
+    return results
@@ -0,0 +1,81 @@
+"""
+Compact binary protocol for /predict/tensor.
+
+Request (images already resized to 224x224 RGB, uint8):
+- application/octet-stream: raw bytes of a C-contiguous (N, 224, 224, 3) or (224, 224, 3) array
+- application/x-msgpack: {"shape": [N, 224, 224, 3], "data": <raw bytes>}
+Response (same content type as the request unless Accept says otherwise):
+- application/octet-stream: little-endian float32 (N, num_classes) probabilities
+- application/x-msgpack: {"shape": [N, num_classes], "probs": <float32 bytes>, "classes": [...]}
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from src.preprocessing import IMG_SIZE
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+OCTET_STREAM = "application/octet-stream"
+MSGPACK = "application/x-msgpack"
+IMAGE_SHAPE = (*IMG_SIZE, 3)
+IMAGE_NBYTES = int(np.prod(IMAGE_SHAPE))
+
+
+def _media_type(header: str) -> str:
+    return (header or "").split(";")[0].strip().lower()
+
+
+def decode_tensor_request(body: bytes, content_type: str) -> np.ndarray:
+    """
+    Body -> read-only uint8 view of shape (N, 224, 224, 3); no copy for raw bytes.
+    Raises ValueError on bad size/shape, LookupError on unsupported content type.
+    """
+    media_type = _media_type(content_type)
+    if media_type == MSGPACK:
+        if not HAS_MSGPACK:
+            raise LookupError("msgpack is not installed on the server")
+        payload = msgpack.unpackb(body, raw=False)
+        shape = tuple(payload["shape"])
+        data = payload["data"]
+        if shape[-3:] != IMAGE_SHAPE or len(shape) not in (3, 4):
+            raise ValueError(f"shape must be (N, {IMAGE_SHAPE[0]}, {IMAGE_SHAPE[1]}, 3), got {shape}")
+        if int(np.prod(shape)) != len(data):
+            raise ValueError(f"shape {shape} does not match {len(data)} data bytes")
+    elif media_type == OCTET_STREAM:
+        data = body
+    else:
+        raise LookupError(f"Unsupported content type {content_type!r}; use {OCTET_STREAM} or {MSGPACK}")
+    if len(data) == 0 or len(data) % IMAGE_NBYTES:
+        raise ValueError(f"Body must hold a multiple of {IMAGE_NBYTES} bytes (224x224x3 uint8), got {len(data)}")
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, *IMAGE_SHAPE)
+
+
+def encode_probabilities(probs: np.ndarray, classes: List[str], media_type: str) -> Tuple[bytes, str]:
+    """(N, C) probabilities -> (body, media type)."""
+    probs = np.ascontiguousarray(probs, dtype="<f4")
+    if _media_type(media_type) == MSGPACK and HAS_MSGPACK:
+        body = msgpack.packb({"shape": list(probs.shape), "probs": probs.tobytes(), "classes": classes})
+        return body, MSGPACK
+    return probs.tobytes(), OCTET_STREAM
+
+
+def encode_tensor_request(images: np.ndarray, media_type: str = OCTET_STREAM) -> bytes:
+    """Client side: uint8 (N, 224, 224, 3) or (224, 224, 3) -> request body."""
+    images = np.ascontiguousarray(images, dtype=np.uint8)
+    if _media_type(media_type) == MSGPACK:
+        return msgpack.packb({"shape": list(images.shape), "data": images.tobytes()})
+    return images.tobytes()
+
+
+def decode_probabilities(body: bytes, media_type: str, num_classes: int = 2) -> np.ndarray:
+    """Client side: response body -> (N, num_classes) float32."""
+    if _media_type(media_type) == MSGPACK:
+        payload = msgpack.unpackb(body, raw=False)
+        return np.frombuffer(payload["probs"], dtype="<f4").reshape(payload["shape"])
+    return np.frombuffer(body, dtype="<f4").reshape(-1, num_classes)
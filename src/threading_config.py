@@ -0,0 +1,174 @@
+"""
+CPU thread-pool sizing for TensorFlow, OpenMP and BLAS.
+- effective_cpus(): CPUs actually available, from cgroup v2/v1 CPU quota and sched affinity
+  (os.cpu_count() reports host cores, which oversubscribes a 1-CPU container)
+- Settings come from, in increasing priority: defaults for the effective CPU count, a
+  profile ("latency" / "throughput") in the autotuned models/thread_config.json,
+  and explicit TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS env vars
+- apply_thread_settings() must run before TensorFlow creates its runtime
+"""
+
+import json
+import logging
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
+except ImportError:
+    HAS_THREADPOOLCTL = False
+
+logger = logging.getLogger(__name__)
+
+THREAD_CONFIG = "models/thread_config.json"
+PROFILES = ("latency", "throughput")
+NATIVE_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(cgroup_root: str = "/sys/fs/cgroup") -> Optional[float]:
+    """CPU quota in CPUs (e.g. 1.5) from cgroup v2 cpu.max or v1 cfs_quota_us; None if unlimited."""
+    root = Path(cgroup_root)
+    cpu_max = _read(root / "cpu.max")
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    for v1 in (root / "cpu", root / "cpu,cpuacct", root):
+        quota, period = _read(v1 / "cpu.cfs_quota_us"), _read(v1 / "cpu.cfs_period_us")
+        if quota is not None and period is not None:
+            return int(quota) / int(period) if int(quota) > 0 else None
+    return None
+
+
+def effective_cpus(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """Whole CPUs this process can use: min(affinity mask, ceil(cgroup quota)), at least 1."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(cgroup_root)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+def default_settings(cpus: int) -> Dict[str, int]:
+    """One intra-op thread per CPU; a second inter-op thread only when there are spare cores."""
+    return {"intra_op": cpus, "inter_op": 1 if cpus <= 2 else 2}
+
+
+def load_thread_config(path: str = THREAD_CONFIG) -> Optional[dict]:
+    if not Path(path).exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_thread_config(config: dict, path: str = THREAD_CONFIG):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+
+def resolve_thread_settings(
+    profile: Optional[str] = None,
+    config_path: str = THREAD_CONFIG,
+    cpus: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    intra_op / inter_op (and batch_size if the autotuned profile has one) for this machine.
+    profile defaults to the THREAD_PROFILE env var, then "latency".
+    """
+    cpus = cpus or effective_cpus()
+    settings = {**default_settings(cpus), "cpus": cpus}
+    profile = profile or os.getenv("THREAD_PROFILE", "latency")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown thread profile {profile!r}; choose from {PROFILES}")
+    config = load_thread_config(config_path)
+    if config and profile in config.get("profiles", {}):
+        tuned = config["profiles"][profile]
+        settings.update({k: int(tuned[k]) for k in ("intra_op", "inter_op", "batch_size") if k in tuned})
+    for key, var in (("intra_op", "TF_INTRA_OP_THREADS"), ("inter_op", "TF_INTER_OP_THREADS")):
+        if os.getenv(var):
+            settings[key] = int(os.environ[var])
+    return settings
+
+
+def apply_thread_settings(settings: Dict[str, int]) -> Dict[str, int]:
+    """
+    Size TensorFlow, OpenMP and BLAS pools. Env vars cover libraries not loaded yet;
+    threadpoolctl resizes BLAS/OpenMP already loaded by numpy/sklearn, and the
+    tf.config API is used if TensorFlow is already imported. Explicit
+    OMP/OPENBLAS/MKL_NUM_THREADS env vars are left as they are.
+    """
+    intra, inter = settings["intra_op"], settings["inter_op"]
+    for var in NATIVE_THREAD_VARS:
+        os.environ.setdefault(var, str(intra))
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter)
+    if HAS_THREADPOOLCTL:
+        threadpool_limits(int(os.environ["OMP_NUM_THREADS"]))
+    if "tensorflow" in sys.modules:
+        tf = sys.modules["tensorflow"]
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+        except RuntimeError as e:  # runtime already initialised
+            logger.warning(f"TensorFlow thread pools already created, keeping them: {e}")
+    logger.info(f"Thread settings: intra_op={intra}, inter_op={inter}, cpus={settings.get('cpus')}")
+    return settings
+
+
+def thread_env(settings: Dict[str, int], base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for a child process whose TF/OpenMP/BLAS pools should match settings."""
+    env = dict(os.environ if base is None else base)
+    env.update({var: str(settings["intra_op"]) for var in NATIVE_THREAD_VARS})
+    env["TF_INTRA_OP_THREADS"] = env["TF_NUM_INTRAOP_THREADS"] = str(settings["intra_op"])
+    env["TF_INTER_OP_THREADS"] = env["TF_NUM_INTEROP_THREADS"] = str(settings["inter_op"])
+    return env
+
+
+def configure_threads(profile: Optional[str] = None, config_path: str = THREAD_CONFIG) -> Dict[str, int]:
+    """resolve_thread_settings() + apply_thread_settings(); call before importing TensorFlow."""
+    return apply_thread_settings(resolve_thread_settings(profile, config_path))
+
+
+def candidate_thread_counts(cpus: int):
+    """Powers of two up to cpus, plus cpus itself: 6 -> [1, 2, 4, 6]."""
+    counts = {cpus}
+    n = 1
+    while n < cpus:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def select_profiles(trials: list) -> Dict[str, dict]:
+    """
+    Best autotune trial per profile. Each trial has intra_op, inter_op, batch_size,
+    images_per_s and p99_ms. throughput: most images/s at any batch size; latency:
+    lowest p99 at the smallest batch size swept (single requests). Ties go to fewer threads.
+    """
+    def threads(t):
+        return t["intra_op"] + t["inter_op"]
+
+    smallest = min(t["batch_size"] for t in trials)
+    keep = ("intra_op", "inter_op", "batch_size", "images_per_s", "p50_ms", "p99_ms")
+    throughput = max(trials, key=lambda t: (t["images_per_s"], -threads(t)))
+    latency = min((t for t in trials if t["batch_size"] == smallest), key=lambda t: (t["p99_ms"], threads(t)))
+    return {
+        "throughput": {k: throughput[k] for k in keep if k in throughput},
+        "latency": {k: latency[k] for k in keep if k in latency},
+    }
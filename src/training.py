@@ -1,10 +1,19 @@
 """
 Model training with MLflow experiment tracking.
 Baseline: Simple CNN for Cats vs Dogs binary classification.
+Architecture registry: simple_cnn, gap_cnn, separable_cnn, tiny_student
+(latency-profiled; training can pick the most accurate within a latency budget).
 """
 
+import json
 import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
 from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
 try:
     import mlflow
@@ -15,42 +24,349 @@ except ImportError as e:
     MLFLOW_AVAILABLE = False
 
 import numpy as np
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+from sklearn.metrics import accuracy_score
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-try:
-    import seaborn as sns
-    HAS_SEABORN = True
-except ImportError:
-    HAS_SEABORN = False
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
-def build_cnn(input_shape=(224, 224, 3), num_classes=2):
-    """Build a simple CNN baseline."""
+ARCHITECTURES: Dict[str, Callable] = {}
+
+
+def register_architecture(name: str):
+    """Decorator: register a model builder under name for build_model()."""
+    def decorator(fn):
+        ARCHITECTURES[name] = fn
+        return fn
+    return decorator
+
+
+def build_model(architecture: str = "simple_cnn", **kwargs):
+    """Build a compiled model from the architecture registry."""
+    if architecture not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture {architecture!r}; choose from {sorted(ARCHITECTURES)}")
+    return ARCHITECTURES[architecture](**kwargs)
+
+
+def _compile(model, optimizer="adam", learning_rate=None, loss="sparse_categorical_crossentropy"):
     import tensorflow as tf
+
+    if learning_rate is not None:
+        optimizer = tf.keras.optimizers.get(
+            {"class_name": optimizer, "config": {"learning_rate": learning_rate}}
+        )
+    model.compile(optimizer=optimizer, loss=loss, metrics=["accuracy"])
+    return model
+
+
+def _conv_stack(input_shape, filters):
+    """3x3 ReLU Conv2D per entry in filters, MaxPooling between blocks."""
     from tensorflow.keras import layers
 
-    model = tf.keras.Sequential([
-        layers.Conv2D(32, (3, 3), activation="relu", input_shape=input_shape),
-        layers.MaxPooling2D((2, 2)),
-        layers.Conv2D(64, (3, 3), activation="relu"),
-        layers.MaxPooling2D((2, 2)),
-        layers.Conv2D(64, (3, 3), activation="relu"),
+    conv_layers = []
+    for i, n_filters in enumerate(filters):
+        if i == 0:
+            conv_layers.append(layers.Conv2D(n_filters, (3, 3), activation="relu", input_shape=input_shape))
+        else:
+            conv_layers.append(layers.MaxPooling2D((2, 2)))
+            conv_layers.append(layers.Conv2D(n_filters, (3, 3), activation="relu"))
+    return conv_layers
+
+
+@register_architecture("simple_cnn")
+def build_cnn(
+    input_shape=(224, 224, 3),
+    num_classes=2,
+    filters=(32, 64, 64),
+    dense_units=64,
+    dropout=0.5,
+    optimizer="adam",
+    learning_rate=None,
+):
+    """
+    Build a simple CNN baseline.
+    filters: output channels of each Conv2D block (pooling between blocks).
+    optimizer/learning_rate: Keras optimizer name and optional learning rate.
+    """
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    model = tf.keras.Sequential(_conv_stack(input_shape, filters) + [
         layers.Flatten(),
-        layers.Dense(64, activation="relu"),
-        layers.Dropout(0.5),
+        layers.Dense(dense_units, activation="relu"),
+        layers.Dropout(dropout),
+        layers.Dense(num_classes, activation="softmax"),
+    ])
+    return _compile(model, optimizer, learning_rate)
+
+
+@register_architecture("gap_cnn")
+def build_gap_cnn(
+    input_shape=(224, 224, 3),
+    num_classes=2,
+    filters=(32, 64, 64),
+    dense_units=64,
+    dropout=0.5,
+    optimizer="adam",
+    learning_rate=None,
+):
+    """Same conv stack as build_cnn, GlobalAveragePooling instead of Flatten (~50x fewer params)."""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    model = tf.keras.Sequential(_conv_stack(input_shape, filters) + [
+        layers.GlobalAveragePooling2D(),
+        layers.Dense(dense_units, activation="relu"),
+        layers.Dropout(dropout),
+        layers.Dense(num_classes, activation="softmax"),
+    ])
+    return _compile(model, optimizer, learning_rate)
+
+
+def _separable_stack(input_shape, stem_filters, block_filters, num_classes, dropout):
+    """MobileNet-style: strided stem conv, then depthwise-separable blocks (stride 2 each), GAP head."""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    model_layers = [
+        layers.Conv2D(stem_filters, (3, 3), strides=2, padding="same", use_bias=False, input_shape=input_shape),
+        layers.BatchNormalization(),
+        layers.ReLU(6.0),
+    ]
+    for n_filters in block_filters:
+        model_layers += [
+            layers.SeparableConv2D(n_filters, (3, 3), strides=2, padding="same", use_bias=False),
+            layers.BatchNormalization(),
+            layers.ReLU(6.0),
+        ]
+    model_layers += [
+        layers.GlobalAveragePooling2D(),
+        layers.Dropout(dropout),
         layers.Dense(num_classes, activation="softmax"),
+    ]
+    return tf.keras.Sequential(model_layers)
+
+
+@register_architecture("separable_cnn")
+def build_separable_cnn(
+    input_shape=(224, 224, 3),
+    num_classes=2,
+    stem_filters=32,
+    block_filters=(64, 128, 128, 256),
+    dropout=0.3,
+    optimizer="adam",
+    learning_rate=None,
+):
+    """Depthwise-separable (MobileNet-style) CNN."""
+    model = _separable_stack(input_shape, stem_filters, block_filters, num_classes, dropout)
+    return _compile(model, optimizer, learning_rate)
+
+
+@register_architecture("tiny_student")
+def build_tiny_student(
+    input_shape=(224, 224, 3),
+    num_classes=2,
+    stem_filters=8,
+    block_filters=(16, 32, 32),
+    dropout=0.2,
+    optimizer="adam",
+    learning_rate=None,
+):
+    """Tiny separable CNN, meant to be trained with distill() from a larger teacher."""
+    model = _separable_stack(input_shape, stem_filters, block_filters, num_classes, dropout)
+    return _compile(model, optimizer, learning_rate)
+
+
+def _load_dataset(data_path: str, mmap_cache: bool = False):
+    """
+    NPZ splits as in-memory arrays, or (mmap_cache=True) memory-mapped from the
+    uncompressed <stem>.mmap/ copy that sweeps use, which costs a second copy on disk.
+    """
+    from src.sweep import DATASET_KEYS, load_shared_dataset, prepare_shared_dataset
+    if mmap_cache:
+        return load_shared_dataset(prepare_shared_dataset(data_path))
+    with np.load(data_path) as npz:
+        return {key: npz[key] for key in DATASET_KEYS}
+
+
+def _predict_batched(model, X, batch_size=32) -> np.ndarray:
+    return np.concatenate([
+        model.predict_on_batch(X[i:i + batch_size]) for i in range(0, len(X), batch_size)
     ])
-    model.compile(
-        optimizer="adam",
-        loss="sparse_categorical_crossentropy",
-        metrics=["accuracy"],
+
+
+def distill(
+    student,
+    teacher,
+    X_train,
+    y_train,
+    X_val,
+    y_val,
+    epochs: int = 3,
+    batch_size: int = 32,
+    temperature: float = 4.0,
+    alpha: float = 0.5,
+):
+    """
+    Knowledge distillation: fit student on alpha * hard labels + (1 - alpha) * teacher
+    probabilities softened by temperature. Student is recompiled back to sparse labels after.
+    """
+    num_classes = student.output_shape[-1]
+    soft = np.power(np.clip(_predict_batched(teacher, X_train, batch_size), 1e-7, 1.0), 1.0 / temperature)
+    soft /= soft.sum(axis=1, keepdims=True)
+    targets = alpha * np.eye(num_classes)[y_train] + (1 - alpha) * soft
+
+    optimizer = student.optimizer
+    student.compile(optimizer=optimizer, loss="categorical_crossentropy", metrics=["accuracy"])
+    history = student.fit(
+        X_train, targets,
+        validation_data=(X_val, np.eye(num_classes)[y_val]),
+        epochs=epochs,
+        batch_size=batch_size,
+        verbose=1,
     )
-    return model
+    student.compile(optimizer=optimizer, loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    return history
+
+
+def _median_latency_ms(model, x, n_runs: int) -> float:
+    model(x, training=False)  # warm-up
+    times = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        model(x, training=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def _latency_probe():
+    """Child process entry point for _latency_in_subprocess: JSON spec in argv, JSON out."""
+    import tensorflow as tf
+    from src.threading_config import apply_thread_settings
+
+    spec = json.loads(sys.argv[1])
+    apply_thread_settings(spec["threads"])
+    model = tf.keras.models.load_model(spec["model_path"])
+    batch = np.random.default_rng(0).random((spec["batch_size"], *model.input_shape[1:]), dtype=np.float32)
+    print(json.dumps({
+        "latency_single_ms": _median_latency_ms(model, batch[:1], spec["n_runs"]),
+        "latency_batch_ms": _median_latency_ms(model, batch, spec["n_runs"]),
+    }))
+
+
+def _latency_in_subprocess(model_path: str, batch_size: int, n_runs: int, threads: Dict[str, int]) -> dict:
+    """Median latencies of a saved model in a fresh process whose thread pools match threads."""
+    from src.threading_config import thread_env
+
+    spec = {"model_path": model_path, "batch_size": batch_size, "n_runs": n_runs,
+            "threads": {k: threads[k] for k in ("intra_op", "inter_op")}}
+    root = str(Path(__file__).resolve().parent.parent)
+    code = f"import sys; sys.path.insert(0, {root!r}); from src.training import _latency_probe; _latency_probe()"
+    proc = subprocess.run(
+        [sys.executable, "-c", code, json.dumps(spec)],
+        capture_output=True, text=True, cwd=root,
+        env=thread_env(threads, dict(os.environ, TF_CPP_MIN_LOG_LEVEL="2")),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Latency probe failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def profile_model(
+    model, X_eval, y_eval, batch_size: int = 32, n_runs: int = 20,
+    threads: Optional[Dict[str, int]] = None,
+) -> dict:
+    """
+    Parameter count, saved .h5 size, median single-image and batched CPU latency,
+    and accuracy on (X_eval, y_eval).
+    threads: intra_op/inter_op to measure latency under (e.g. the serving "latency"
+    profile), in a fresh process since TF pools are fixed once created. None: in-process.
+    """
+    batch = np.asarray(X_eval[:batch_size])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.h5"
+        model.save(str(path))
+        file_size = path.stat().st_size
+        if threads is not None:
+            latency = _latency_in_subprocess(str(path), len(batch), n_runs, threads)
+        else:
+            latency = {"latency_single_ms": _median_latency_ms(model, batch[:1], n_runs),
+                       "latency_batch_ms": _median_latency_ms(model, batch, n_runs)}
+
+    y_pred = np.argmax(_predict_batched(model, X_eval, batch_size), axis=1)
+    return {
+        "params": int(model.count_params()),
+        "file_size_bytes": int(file_size),
+        **latency,
+        "latency_per_image_batched_ms": latency["latency_batch_ms"] / len(batch),
+        "accuracy": float(accuracy_score(y_eval, y_pred)),
+    }
+
+
+def select_within_budget(
+    profiles: Dict[str, dict],
+    latency_budget_ms: Optional[float] = None,
+    latency_key: str = "latency_single_ms",
+) -> str:
+    """
+    Name of the most accurate profile with latency_key <= latency_budget_ms.
+    No budget: most accurate overall. Nothing fits: the fastest candidate.
+    """
+    if not profiles:
+        raise ValueError("No profiles to select from")
+    fits = {
+        name: p for name, p in profiles.items()
+        if latency_budget_ms is None or p[latency_key] <= latency_budget_ms
+    }
+    if not fits:
+        logger.warning(f"No candidate within {latency_budget_ms} ms; using the fastest")
+        return min(profiles, key=lambda n: profiles[n][latency_key])
+    return max(fits, key=lambda n: (fits[n]["accuracy"], -fits[n][latency_key]))
+
+
+def _train_candidates(
+    candidates: List[str],
+    X_train, y_train, X_val, y_val,
+    epochs: int,
+    batch_size: int,
+    model_params: dict,
+    latency_budget_ms: Optional[float],
+):
+    """
+    Train and profile every candidate; returns (chosen name, models, histories, profiles).
+    Latency is measured under the serving ("latency" profile) thread settings, not the
+    throughput settings training runs with.
+    """
+    from src.threading_config import resolve_thread_settings
+    serving_threads = resolve_thread_settings("latency")
+    models, histories, profiles = {}, {}, {}
+    # Teachers first so tiny_student can be distilled from the best of them
+    ordered = sorted(candidates, key=lambda n: n == "tiny_student")
+    for name in ordered:
+        params = model_params if name == "simple_cnn" else {}
+        model = build_model(name, **params)
+        teachers = {n: p for n, p in profiles.items() if n != "tiny_student"}
+        if name == "tiny_student" and teachers:
+            teacher = max(teachers, key=lambda n: teachers[n]["accuracy"])
+            logger.info(f"Distilling tiny_student from {teacher}")
+            histories[name] = distill(model, models[teacher], X_train, y_train, X_val, y_val,
+                                      epochs=epochs, batch_size=batch_size)
+        else:
+            histories[name] = model.fit(
+                X_train, y_train,
+                validation_data=(X_val, y_val),
+                epochs=epochs,
+                batch_size=batch_size,
+                verbose=1,
+            )
+        models[name] = model
+        profiles[name] = profile_model(model, X_val, y_val, batch_size=batch_size, threads=serving_threads)
+        logger.info(f"{name}: {profiles[name]}")
+
+    chosen = select_within_budget(profiles, latency_budget_ms)
+    return chosen, models, histories, profiles
 
 
 def train_and_track(
@@ -58,12 +374,29 @@ def train_and_track(
     epochs: int = 3,
     batch_size: int = 32,
     experiment_name: str = "cats-vs-dogs",
+    model_params: dict = None,
+    architecture: str = "simple_cnn",
+    candidates: Optional[List[str]] = None,
+    latency_budget_ms: Optional[float] = None,
+    plots: bool = True,
+    mmap_cache: bool = False,
 ):
-    """Train model and log to MLflow."""
+    """
+    Train model and log to MLflow.
+    model_params: optional build_cnn keyword arguments (e.g. best config from a sweep).
+    architecture: registry name to train when candidates is not given.
+    candidates: registry names to train and profile; the most accurate within
+        latency_budget_ms (single-image CPU latency) is evaluated and saved.
+    plots: render confusion matrix / ROC / loss curve PNGs (background thread).
+    mmap_cache: read splits from the sweep's memory-mapped cache instead of loading the NPZ.
+    """
+    from src.threading_config import configure_threads, resolve_thread_settings
+    configure_threads("throughput")
+    model_params = dict(model_params or {})
     Path("models").mkdir(exist_ok=True)
     Path("logs").mkdir(exist_ok=True)
 
-    data = np.load(data_path)
+    data = _load_dataset(data_path, mmap_cache)
     X_train = data["X_train"]
     y_train = data["y_train"]
     X_val = data["X_val"]
@@ -75,23 +408,43 @@ def train_and_track(
         mlflow.set_experiment(experiment_name)
         mlflow.start_run(run_name="cnn-baseline")
 
-    model = build_cnn()
+    if candidates:
+        architecture, models, histories, profiles = _train_candidates(
+            candidates, X_train, y_train, X_val, y_val,
+            epochs, batch_size, model_params, latency_budget_ms,
+        )
+        model, history = models[architecture], histories[architecture]
+        profiles_path = "logs/model_profiles.json"
+        with open(profiles_path, "w") as f:
+            json.dump({"selected": architecture, "latency_budget_ms": latency_budget_ms,
+                       "latency_threads": resolve_thread_settings("latency"),
+                       "profiles": profiles}, f, indent=2)
+        logger.info(f"Selected {architecture} (budget={latency_budget_ms} ms)")
+        if MLFLOW_AVAILABLE:
+            mlflow.log_artifact(profiles_path)
+            for name, prof in profiles.items():
+                mlflow.log_metrics({f"{name}_{k}": v for k, v in prof.items()})
+    else:
+        model = build_model(architecture, **model_params)
+        history = model.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=epochs,
+            batch_size=batch_size,
+            verbose=1,
+        )
+
     if MLFLOW_AVAILABLE:
         mlflow.log_params({
-            "model": "simple_cnn",
+            "model": architecture,
             "epochs": epochs,
             "batch_size": batch_size,
             "input_shape": list(X_train.shape[1:]),
+            **({"candidates": ",".join(candidates), "latency_budget_ms": latency_budget_ms}
+               if candidates else {}),
+            **{k: str(v) for k, v in model_params.items()},
         })
 
-    history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=epochs,
-        batch_size=batch_size,
-        verbose=1,
-    )
-
     # Log metrics
     train_acc = history.history["accuracy"][-1]
     val_acc = history.history["val_accuracy"][-1]
@@ -101,55 +454,117 @@ def train_and_track(
             "val_accuracy": val_acc,
         })
 
-    # Eval on test
-    y_pred = np.argmax(model.predict(X_test), axis=1)
-    test_acc = accuracy_score(y_test, y_pred)
+    # Eval on test (streamed in batches; plots rendered in the background)
+    from src.evaluation import evaluate_batched, save_plots_async
+    evaluator = evaluate_batched(model.predict_on_batch, X_test, y_test, batch_size=batch_size)
+    test_metrics = evaluator.result()
+    test_acc = test_metrics["accuracy"]
     if MLFLOW_AVAILABLE:
         mlflow.log_metrics({
-            "test_accuracy": test_acc,
-            "test_precision": precision_score(y_test, y_pred, zero_division=0),
-            "test_recall": recall_score(y_test, y_pred, zero_division=0),
-            "test_f1": f1_score(y_test, y_pred, zero_division=0),
+            f"test_{k}": test_metrics[k]
+            for k in ("accuracy", "precision", "recall", "f1", "ece", "roc_auc", "pr_auc")
         })
-
-    # Confusion matrix artifact
-    cm = confusion_matrix(y_test, y_pred)
-    fig, ax = plt.subplots(figsize=(6, 4))
-    if HAS_SEABORN:
-        sns.heatmap(cm, annot=True, fmt="d", cmap="Blues", ax=ax,
-                    xticklabels=["cat", "dog"], yticklabels=["cat", "dog"])
-    else:
-        ax.imshow(cm, cmap="Blues")
-        ax.set_xticks([0, 1])
-        ax.set_yticks([0, 1])
-        ax.set_xticklabels(["cat", "dog"])
-        ax.set_yticklabels(["cat", "dog"])
-        for i in range(2):
-            for j in range(2):
-                ax.text(j, i, str(cm[i, j]), ha="center", va="center")
-    ax.set_title("Confusion Matrix")
-    plt.tight_layout()
-    cm_path = "logs/confusion_matrix.png"
-    plt.savefig(cm_path, dpi=100)
-    plt.close()
-    if MLFLOW_AVAILABLE:
-        mlflow.log_artifact(cm_path)
-
-    # Loss curve
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(history.history["loss"], label="train")
-    ax.plot(history.history["val_loss"], label="val")
-    ax.set_title("Loss Curve")
-    ax.legend()
-    plt.tight_layout()
-    loss_path = "logs/loss_curve.png"
-    plt.savefig(loss_path, dpi=100)
-    plt.close()
-    if MLFLOW_AVAILABLE:
-        mlflow.log_artifact(loss_path)
-        mlflow.keras.log_model(model, "model")
+    if plots:
+        plot_thread, plot_paths = save_plots_async(evaluator, history.history)
 
     # Save for inference service (.h5 for reproducibility)
     model.save("models/model.h5")
     logger.info(f"Model saved to models/model.h5, test_acc={test_acc:.4f}")
+    if MLFLOW_AVAILABLE:
+        mlflow.keras.log_model(model, "model")
+    if plots:
+        plot_thread.join()
+        if MLFLOW_AVAILABLE:
+            for path in plot_paths:
+                mlflow.log_artifact(path)
+    if MLFLOW_AVAILABLE:
+        mlflow.end_run()
     return model
+
+
+def train_cascade(
+    data_path: str = "data/processed/dataset.npz",
+    epochs: int = 3,
+    batch_size: int = 32,
+    max_accuracy_drop: float = 0.01,
+    fast_architecture: str = "tiny_student",
+    full_model_path: str = "models/model.h5",
+    experiment_name: str = "cats-vs-dogs",
+    mmap_cache: bool = False,
+):
+    """
+    Build the serving cascade: distill a fast model from the full model, calibrate both
+    models (temperature scaling) and pick the escalation threshold on validation data
+    so cascade accuracy stays within max_accuracy_drop of the full model.
+    Writes models/model_fast.h5 and models/cascade.json. Trains the full model first if missing.
+    mmap_cache: as in train_and_track.
+    """
+    import tensorflow as tf
+    from src.cascade import (
+        CASCADE_CONFIG, apply_temperature, cascade_predict, choose_threshold,
+        file_sha256, fit_temperature, save_cascade_config,
+    )
+
+    if not Path(full_model_path).exists():
+        train_and_track(data_path, epochs=epochs, batch_size=batch_size, experiment_name=experiment_name,
+                        mmap_cache=mmap_cache)
+    full = tf.keras.models.load_model(full_model_path)
+
+    data = _load_dataset(data_path, mmap_cache)
+    X_train, y_train = data["X_train"], data["y_train"]
+    X_val, y_val = data["X_val"], data["y_val"]
+    X_test, y_test = data["X_test"], data["y_test"]
+
+    if MLFLOW_AVAILABLE:
+        mlflow.set_experiment(experiment_name)
+        mlflow.start_run(run_name="cascade")
+
+    fast = build_model(fast_architecture)
+    distill(fast, full, X_train, y_train, X_val, y_val, epochs=epochs, batch_size=batch_size)
+
+    fast_val = _predict_batched(fast, X_val, batch_size)
+    full_val = _predict_batched(full, X_val, batch_size)
+    temperature = fit_temperature(fast_val, y_val)
+    full_temperature = fit_temperature(full_val, y_val)
+    choice = choose_threshold(
+        apply_temperature(fast_val, temperature), apply_temperature(full_val, full_temperature),
+        y_val, max_accuracy_drop,
+    )
+
+    test_probs, escalated = cascade_predict(
+        X_test,
+        lambda x: _predict_batched(fast, x, batch_size),
+        lambda x: _predict_batched(full, x, batch_size),
+        choice["threshold"], temperature, full_temperature,
+    )
+    fast_path = "models/model_fast.h5"
+    fast.save(fast_path)
+    config = {
+        "fast_model": fast_path,
+        "fast_architecture": fast_architecture,
+        "threshold": choice["threshold"],
+        "temperature": temperature,
+        "full_temperature": full_temperature,
+        # full_temperature only applies to the model it was fitted on
+        "full_model_sha256": file_sha256(full_model_path),
+        "max_accuracy_drop": max_accuracy_drop,
+        "val": choice,
+        "test": {
+            "cascade_accuracy": float(accuracy_score(y_test, test_probs.argmax(axis=1))),
+            "full_accuracy": float(accuracy_score(y_test, _predict_batched(full, X_test, batch_size).argmax(axis=1))),
+            "escalation_rate": float(escalated.mean()),
+        },
+    }
+    save_cascade_config(config)
+    logger.info(f"Cascade saved to {CASCADE_CONFIG}: threshold={choice['threshold']:.3f} "
+                f"T={temperature:.2f} T_full={full_temperature:.2f} val_escalation={choice['escalation_rate']:.2%} test={config['test']}")
+
+    if MLFLOW_AVAILABLE:
+        mlflow.log_params({"fast_architecture": fast_architecture, "max_accuracy_drop": max_accuracy_drop,
+                           "threshold": choice["threshold"], "temperature": temperature,
+                           "full_temperature": full_temperature})
+        mlflow.log_metrics({f"val_{k}": v for k, v in choice.items() if k != "threshold"})
+        mlflow.log_metrics({f"test_{k}": v for k, v in config["test"].items()})
+        mlflow.log_artifact(CASCADE_CONFIG)
+        mlflow.end_run()
+    return config
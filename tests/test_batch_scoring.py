@@ -0,0 +1,166 @@
+"""Unit tests for offline bulk scoring."""
+
+import json
+import sys
+import tarfile
+from functools import partial
+import numpy as np
+import pytest
+from pathlib import Path
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import src.batch_scoring
+import src.inference
+from src.batch_scoring import ParquetSink, chain_digest, iter_source, decode_batch, score
+
+
+class _DogModel:
+    """Stand-in for the Keras model: always 80% dog."""
+
+    def predict_on_batch(self, x):
+        assert x.dtype == np.float32 and x.shape[1:] == (224, 224, 3)
+        return np.tile([0.2, 0.8], (len(x), 1))
+
+
+class _CrashingModel(_DogModel):
+    """Fails on call number fail_on, like a run killed mid-way."""
+
+    def __init__(self, fail_on):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def predict_on_batch(self, x):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("interrupted")
+        return super().predict_on_batch(x)
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    root = tmp_path / "images"
+    for cls in ("cats", "dogs"):
+        (root / cls).mkdir(parents=True)
+        for i in range(3):
+            Image.new("RGB", (64, 48), color=(i * 40, 0, 0)).save(root / cls / f"{i}.jpg")
+    (root / "cats" / "broken.png").write_bytes(b"not an image")
+    (root / "notes.txt").write_text("skip me")
+    return root
+
+
+def test_iter_source_directory_is_sorted_and_filtered(image_dir):
+    """Directory source yields images only, in a stable order, honouring skip."""
+    keys = [k for k, _ in iter_source(str(image_dir))]
+    assert keys == sorted(keys) and len(keys) == 7
+    assert [k for k, _ in iter_source(str(image_dir), skip=5)] == keys[5:]
+
+
+def test_iter_source_tar_yields_bytes(image_dir, tmp_path):
+    """Tar source streams member bytes."""
+    archive = tmp_path / "images.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(image_dir, arcname="images")
+    items = list(iter_source(str(archive)))
+    assert len(items) == 7
+    assert all(isinstance(payload, bytes) for _, payload in items)
+
+
+def test_decode_batch_reports_errors(image_dir):
+    """Corrupt files are reported, valid ones decoded to uint8."""
+    keys, batch, errors = decode_batch(list(iter_source(str(image_dir))))
+    assert batch.shape == (6, 224, 224, 3) and batch.dtype == np.uint8
+    assert [k for k, _ in errors] == [str(Path("cats") / "broken.png")]
+
+
+def test_score_writes_jsonl_and_resumes(image_dir, tmp_path, monkeypatch):
+    """score() writes one row per image and a completed checkpoint makes a rerun a no-op."""
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _DogModel())
+    out = tmp_path / "scores.jsonl"
+    stats = score(str(image_dir), str(out), batch_size=2, workers=1)
+    assert stats == {"scored": 6, "errors": 1, "processed": 7}
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(rows) == 7
+    assert {r["label"] for r in rows if r["error"] is None} == {"dog"}
+
+    stats = score(str(image_dir), str(out), batch_size=2, workers=1)
+    assert stats["processed"] == 7
+    assert len(out.read_text().splitlines()) == 7
+
+
+def test_iter_source_refuses_changed_prefix(image_dir):
+    """Skipping with a digest raises if the skipped keys are no longer the same."""
+    keys = [k for k, _ in iter_source(str(image_dir))]
+    digest = chain_digest("", keys[:4])
+    assert [k for k, _ in iter_source(str(image_dir), skip=4, skip_digest=digest)] == keys[4:]
+    Image.new("RGB", (8, 8)).save(image_dir / "cats" / "00.jpg")  # sorts before cats/0.jpg
+    with pytest.raises(ValueError, match="changed"):
+        next(iter_source(str(image_dir), skip=4, skip_digest=digest))
+
+
+def test_score_refuses_resume_when_source_changed(image_dir, tmp_path, monkeypatch):
+    """An interrupted run over a source that then changes is not resumed at a wrong offset."""
+    out = tmp_path / "scores.jsonl"
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _CrashingModel(fail_on=3))
+    with pytest.raises(RuntimeError):
+        score(str(image_dir), str(out), batch_size=2, workers=1, prefetch=1)
+    (image_dir / "cats" / "0.jpg").unlink()
+
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _DogModel())
+    before = out.read_bytes()
+    with pytest.raises(ValueError, match="changed"):
+        score(str(image_dir), str(out), batch_size=2, workers=1)
+    assert out.read_bytes() == before  # output untouched
+    assert score(str(image_dir), str(out), batch_size=2, workers=1, resume=False)["processed"] == 6
+
+
+def test_score_parquet_resumes_after_interruption(image_dir, tmp_path, monkeypatch):
+    """Parquet parts committed before a crash are kept; the rerun writes each image exactly once."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(src.batch_scoring, "ParquetSink", partial(ParquetSink, rows_per_part=2))
+    out = tmp_path / "scores.parquet"
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _CrashingModel(fail_on=3))
+    with pytest.raises(RuntimeError):
+        score(str(image_dir), str(out), batch_size=2, workers=1, prefetch=1)
+    assert json.loads((tmp_path / "scores.parquet.ckpt.json").read_text())["processed"] == 4
+
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _DogModel())
+    stats = score(str(image_dir), str(out), batch_size=2, workers=1)
+    assert stats == {"scored": 6, "errors": 1, "processed": 7}
+    paths = pq.read_table(out).column("path").to_pylist()
+    assert sorted(paths) == sorted(k for k, _ in iter_source(str(image_dir)))
+
+
+def test_score_start_over_discards_old_checkpoint(image_dir, tmp_path, monkeypatch):
+    """A crashed resume=False run must not leave the old checkpoint to resume into an emptied file."""
+    out = tmp_path / "scores.jsonl"
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _DogModel())
+    score(str(image_dir), str(out), batch_size=2, workers=1)
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _CrashingModel(fail_on=1))
+    with pytest.raises(RuntimeError):
+        score(str(image_dir), str(out), batch_size=2, workers=1, resume=False)
+    assert not (tmp_path / "scores.jsonl.ckpt.json").exists()
+
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _DogModel())
+    assert score(str(image_dir), str(out), batch_size=2, workers=1)["processed"] == 7
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(rows) == 7 and b"\0" not in out.read_bytes()
+
+
+def test_score_refuses_checkpoint_ahead_of_output(image_dir, tmp_path, monkeypatch):
+    """A checkpoint pointing past the end of the JSONL (or at missing parts) is rejected."""
+    out = tmp_path / "scores.jsonl"
+    monkeypatch.setattr(src.inference, "load_keras_model", lambda path=None: _DogModel())
+    score(str(image_dir), str(out), batch_size=2, workers=1)
+    out.write_bytes(b"")
+    with pytest.raises(ValueError, match="shorter"):
+        score(str(image_dir), str(out), batch_size=2, workers=1)
+    with pytest.raises(ValueError, match="not found"):
+        score(str(tmp_path / "missing"), str(out), batch_size=2, workers=1)
+
+
+def test_parquet_sink_rejects_missing_parts(tmp_path):
+    pytest.importorskip("pyarrow")
+    with pytest.raises(ValueError, match="missing part"):
+        ParquetSink(tmp_path / "scores.parquet", {"part": 2})
@@ -0,0 +1,85 @@
+"""Unit tests for the confidence-based model cascade."""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.cascade import (
+    apply_temperature, fit_temperature, choose_threshold, cascade_predict, file_sha256,
+    full_model_temperature,
+)
+
+
+def _probs(p_dog):
+    p_dog = np.asarray(p_dog, dtype=np.float64)
+    return np.stack([1 - p_dog, p_dog], axis=1)
+
+
+def test_apply_temperature_preserves_argmax():
+    """Temperature scaling softens (T > 1) without changing predictions."""
+    probs = _probs([0.9, 0.2, 0.6])
+    soft = apply_temperature(probs, 2.0)
+    np.testing.assert_array_equal(soft.argmax(axis=1), probs.argmax(axis=1))
+    assert (soft.max(axis=1) < probs.max(axis=1)).all()
+    np.testing.assert_allclose(apply_temperature(probs, 1.0), probs, atol=1e-6)
+
+
+def test_fit_temperature_softens_overconfident_model():
+    """An overconfident model that is often wrong gets T > 1."""
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 500)
+    correct = rng.random(500) < 0.7
+    pred = np.where(correct, y, 1 - y)
+    probs = _probs(np.where(pred == 1, 0.99, 0.01))
+    assert fit_temperature(probs, y) > 1.5
+
+
+def test_choose_threshold_minimises_escalation_within_bound():
+    """Only the images the fast model gets wrong (low confidence) need escalating."""
+    y = np.array([0, 1, 0, 1, 0, 1])
+    fast = _probs([0.05, 0.95, 0.55, 0.45, 0.1, 0.9])  # wrong on the two 0.55/0.45 rows
+    full = _probs([0.1, 0.9, 0.2, 0.8, 0.1, 0.9])  # always right
+    choice = choose_threshold(fast, full, y, max_accuracy_drop=0.0)
+    assert choice["escalation_rate"] == 2 / 6
+    assert choice["cascade_accuracy"] == choice["full_accuracy"] == 1.0
+    loose = choose_threshold(fast, full, y, max_accuracy_drop=0.5)
+    assert loose["escalation_rate"] == 0.0
+
+
+def test_cascade_predict_runs_full_model_on_low_confidence_rows():
+    """Only rows below the threshold reach the full model."""
+    batch = np.arange(3, dtype=np.float32).reshape(3, 1)
+    seen = []
+
+    def full_fn(x):
+        seen.append(x.copy())
+        return _probs([0.0] * len(x))
+
+    probs, escalated = cascade_predict(batch, lambda x: _probs([0.95, 0.6, 0.1]), full_fn, threshold=0.8)
+    np.testing.assert_array_equal(escalated, [False, True, False])
+    np.testing.assert_array_equal(seen[0], [[1.0]])
+    np.testing.assert_allclose(probs[1], [1.0, 0.0])
+
+
+def test_cascade_predict_calibrates_escalated_rows():
+    """Escalated rows are scaled by the full model's temperature, not returned raw."""
+    batch = np.zeros((2, 1), dtype=np.float32)
+    full = _probs([0.9, 0.9])
+    probs, escalated = cascade_predict(batch, lambda x: _probs([0.95, 0.6]), lambda x: full[:len(x)],
+                                       threshold=0.8, full_temperature=2.0)
+    assert escalated.tolist() == [False, True]
+    np.testing.assert_allclose(probs[1], apply_temperature(full[:1], 2.0)[0])
+    assert probs[1].max() < 0.9
+
+
+def test_full_model_temperature_requires_matching_model(tmp_path):
+    """A stored full_temperature applies only to the model file it was fitted on."""
+    model = tmp_path / "model.h5"
+    model.write_bytes(b"weights v1")
+    config = {"full_temperature": 1.7, "full_model_sha256": file_sha256(str(model))}
+    assert full_model_temperature(config, str(model)) == 1.7
+    model.write_bytes(b"weights v2")
+    assert full_model_temperature(config, str(model)) == 1.0
+    assert full_model_temperature(None, str(model)) == 1.0
@@ -0,0 +1,89 @@
+"""Unit tests for the adaptive concurrency limiter and request deadlines."""
+
+import sys
+import time
+import numpy as np
+import pytest
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.concurrency import AIMDLimiter, parse_deadline, deadline_expired
+
+
+def test_limiter_sheds_over_limit():
+    """try_acquire fails once inflight reaches the limit, succeeds after release."""
+    limiter = AIMDLimiter(initial_limit=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_limiter_additive_increase_when_saturated():
+    """Fast requests at the limit grow it by ~1 per limit's worth of completions."""
+    limiter = AIMDLimiter(initial_limit=2, latency_target_s=1.0)
+    for _ in range(4):
+        assert limiter.try_acquire() and limiter.try_acquire()
+        limiter.release(0.01)
+        limiter.release(0.01)
+    assert limiter.limit >= 3
+
+
+def test_limiter_multiplicative_decrease_on_slow_requests():
+    """Latency above target backs the limit off, never below min_limit."""
+    limiter = AIMDLimiter(initial_limit=10, latency_target_s=0.1, backoff=0.5, min_limit=2)
+    for _ in range(10):
+        limiter.try_acquire()
+        limiter.release(1.0)
+    assert limiter.limit == 2
+
+
+def test_parse_deadline():
+    """Deadline header parses to a timestamp; malformed values raise."""
+    assert parse_deadline(None) is None
+    assert parse_deadline("1700000000.5") == 1700000000.5
+    with pytest.raises(ValueError):
+        parse_deadline("soon")
+    assert deadline_expired(time.time() - 1)
+    assert not deadline_expired(None)
+
+
+class _StubModel:
+    def predict(self, x, verbose=0):
+        return np.array([[0.3, 0.7]])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+    monkeypatch.setattr(app, "MODEL", _StubModel())
+    monkeypatch.setattr(app, "LIMITER", AIMDLimiter(initial_limit=1))
+    return TestClient(app.app), app
+
+
+def _jpeg():
+    buf = BytesIO()
+    Image.new("RGB", (50, 50)).save(buf, format="JPEG")
+    return {"file": ("x.jpg", buf.getvalue(), "image/jpeg")}
+
+
+def test_predict_rejects_expired_deadline(client):
+    """/predict returns 504 without inference when the deadline has already passed."""
+    c, _ = client
+    r = c.post("/predict", files=_jpeg(), headers={"X-Request-Deadline": str(time.time() - 5)})
+    assert r.status_code == 504
+
+
+def test_predict_sheds_when_limit_reached(client):
+    """/predict returns 503 with Retry-After when no limiter slot is free."""
+    c, app = client
+    assert c.post("/predict", files=_jpeg()).json()["label"] == "dog"
+    while app.LIMITER.try_acquire():
+        pass
+    r = c.post("/predict", files=_jpeg())
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
@@ -0,0 +1,85 @@
+"""Unit tests for the streaming evaluation engine."""
+
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+from sklearn.metrics import (
+    accuracy_score,
+    average_precision_score,
+    confusion_matrix,
+    f1_score,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.evaluation import StreamingEvaluator, evaluate_batched, save_plots
+
+
+def _assert_same(a, b):
+    assert a.pop("confusion_matrix") == b.pop("confusion_matrix")
+    assert a == pytest.approx(b)
+
+
+@pytest.fixture
+def predictions():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 1000)
+    p_dog = np.clip(0.5 + (y - 0.5) * 0.4 + rng.normal(0, 0.25, 1000), 0, 1)
+    return y, np.stack([1 - p_dog, p_dog], axis=1)
+
+
+def test_batched_metrics_match_sklearn(predictions):
+    """Streaming over uneven batches gives sklearn's numbers."""
+    y, probs = predictions
+    ev = StreamingEvaluator()
+    for start in range(0, len(y), 37):
+        ev.update(y[start:start + 37], probs[start:start + 37])
+    res = ev.result()
+    y_pred = probs.argmax(axis=1)
+    assert res["accuracy"] == pytest.approx(accuracy_score(y, y_pred))
+    assert res["precision"] == pytest.approx(precision_score(y, y_pred, zero_division=0))
+    assert res["recall"] == pytest.approx(recall_score(y, y_pred, zero_division=0))
+    assert res["f1"] == pytest.approx(f1_score(y, y_pred, zero_division=0))
+    assert res["confusion_matrix"] == confusion_matrix(y, y_pred).tolist()
+    assert res["roc_auc"] == pytest.approx(roc_auc_score(y, probs[:, 1]), abs=1e-3)
+    assert res["pr_auc"] == pytest.approx(average_precision_score(y, probs[:, 1]), abs=1e-3)
+    assert res["n_samples"] == 1000
+
+
+def test_ece_is_zero_when_calibrated_and_large_when_overconfident():
+    """ECE measures the confidence/accuracy gap."""
+    y = np.array([1, 1, 1, 0] * 25)
+    calibrated = StreamingEvaluator().update(y, np.tile([0.25, 0.75], (100, 1)))
+    assert calibrated.expected_calibration_error() == pytest.approx(0.0)
+    overconfident = StreamingEvaluator().update(y, np.tile([0.0, 1.0], (100, 1)))
+    assert overconfident.expected_calibration_error() == pytest.approx(0.25)
+
+
+def test_merge_equals_single_pass(predictions):
+    """Evaluators merged from shards equal one evaluator over everything."""
+    y, probs = predictions
+    a = StreamingEvaluator().update(y[:400], probs[:400])
+    b = StreamingEvaluator().update(y[400:], probs[400:])
+    _assert_same(a.merge(b).result(), StreamingEvaluator().update(y, probs).result())
+
+
+def test_zero_division_matches_sklearn():
+    """No predicted positives: precision and f1 are 0, like sklearn zero_division=0."""
+    res = StreamingEvaluator().update([0, 1], [[0.9, 0.1], [0.8, 0.2]]).result()
+    assert res["precision"] == res["f1"] == 0.0
+
+
+def test_evaluate_batched_and_plots(predictions, tmp_path):
+    """evaluate_batched streams a memmap through predict_fn; plots are written."""
+    y, probs = predictions
+    X = np.lib.format.open_memmap(tmp_path / "X.npy", mode="w+", dtype=np.float32, shape=probs.shape)
+    X[:] = probs
+    ev = evaluate_batched(lambda batch: batch, X, y, batch_size=128)
+    _assert_same(ev.result(), StreamingEvaluator().update(y, probs).result())
+    paths = save_plots(ev, {"loss": [1.0, 0.5], "val_loss": [1.1, 0.7]}, str(tmp_path))
+    assert [Path(p).name for p in paths] == ["confusion_matrix.png", "roc_curve.png", "loss_curve.png"]
+    assert all(Path(p).stat().st_size > 0 for p in paths)
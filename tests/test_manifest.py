@@ -0,0 +1,123 @@
+"""Unit tests for the dataset manifest."""
+
+import os
+import shutil
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.manifest import update_manifest, load_manifest, dedupe
+from src.preprocessing import load_dataset
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    root = tmp_path / "raw"
+    np.random.seed(0)
+    for split, n in (("train", 8), ("val", 2), ("test", 2)):
+        for cls in ("cats", "dogs"):
+            (root / split / cls).mkdir(parents=True)
+            for i in range(n):
+                arr = np.random.randint(0, 255, (32, 32, 3), dtype=np.uint8)
+                Image.fromarray(arr).save(root / split / cls / f"{i}.png")
+    return root
+
+
+def test_manifest_records_labels_splits_and_validity(raw_dir, tmp_path):
+    """Every image gets hash, size, dimensions, label and split; corrupt files are invalid."""
+    (raw_dir / "train" / "cats" / "bad.jpg").write_bytes(b"garbage")
+    entries = update_manifest(str(raw_dir), str(tmp_path / "m.json"), workers=1)
+    assert len(entries) == 25
+    by_path = {e["path"]: e for e in entries}
+    good = by_path[str(Path("val") / "dogs" / "0.png")]
+    assert (good["label"], good["split"], good["width"], good["valid"]) == (1, "val", 32, True)
+    assert len(good["sha256"]) == 64
+    assert by_path[str(Path("train") / "cats" / "bad.jpg")]["valid"] is False
+
+
+def test_manifest_update_is_incremental(raw_dir, tmp_path, monkeypatch):
+    """Unchanged files are not re-read; changed, new and deleted files are picked up."""
+    manifest = str(tmp_path / "m.json")
+    update_manifest(str(raw_dir), manifest, workers=1)
+
+    changed = raw_dir / "test" / "cats" / "0.png"
+    Image.new("RGB", (10, 20)).save(changed)
+    os.utime(changed, ns=(1, 1))
+    (raw_dir / "test" / "dogs" / "1.png").unlink()
+
+    inspected = []
+    import src.manifest
+    real_inspect = src.manifest.inspect_file
+    monkeypatch.setattr(src.manifest, "ProcessPoolExecutor", _InlineExecutor)
+    monkeypatch.setattr(src.manifest, "inspect_file",
+                        lambda root, rel, prev: inspected.append(rel) or real_inspect(root, rel, prev))
+
+    entries = update_manifest(str(raw_dir), manifest)
+    assert inspected == [str(Path("test") / "cats" / "0.png")]
+    assert len(entries) == len(load_manifest(manifest)) == 23
+    assert {e["path"]: e for e in entries}[inspected[0]]["height"] == 20
+
+
+def test_manifest_survives_new_checkout(raw_dir, tmp_path, monkeypatch):
+    """Moved to another path with fresh mtimes, unchanged files are re-hashed but not decoded."""
+    update_manifest(str(raw_dir), str(tmp_path / "processed" / "m.json"), workers=1)
+    checkout = tmp_path / "elsewhere"
+    checkout.mkdir()
+    shutil.copytree(raw_dir, checkout / "raw")
+    shutil.copytree(tmp_path / "processed", checkout / "processed")
+    for path in (checkout / "raw").rglob("*.png"):
+        os.utime(path, ns=(1, 1))
+    Image.new("RGB", (10, 20)).save(checkout / "raw" / "val" / "cats" / "0.png")
+
+    import src.manifest
+    decoded = []
+    real_open = src.manifest.Image.open
+    monkeypatch.setattr(src.manifest, "ProcessPoolExecutor", _InlineExecutor)
+    monkeypatch.setattr(src.manifest.Image, "open", lambda fp: decoded.append(fp) or real_open(fp))
+
+    manifest = str(checkout / "processed" / "m.json")
+    assert load_manifest(manifest, str(checkout / "raw"))
+    entries = update_manifest(str(checkout / "raw"), manifest)
+    assert len(entries) == 24 and len(decoded) == 1
+    assert {e["path"]: e for e in entries}[str(Path("val") / "cats" / "0.png")]["height"] == 20
+    assert all(e["mtime_ns"] == 1 for e in entries if e["height"] == 32)
+
+
+def test_dedupe_prefers_train_over_test(raw_dir, tmp_path):
+    """An image copied into test is dropped in favour of the train copy."""
+    shutil.copy(raw_dir / "train" / "dogs" / "0.png", raw_dir / "test" / "dogs" / "dup.png")
+    entries = update_manifest(str(raw_dir), str(tmp_path / "m.json"), workers=1)
+    kept = dedupe(entries)
+    assert len(kept) == len(entries) - 1
+    assert str(Path("test") / "dogs" / "dup.png") not in {e["path"] for e in kept}
+
+
+def test_load_dataset_reads_from_manifest(raw_dir, tmp_path):
+    """load_dataset uses the manifest and keeps the on-disk split."""
+    X_train, y_train, X_val, y_val, X_test, y_test = load_dataset(
+        str(raw_dir), manifest_path=str(tmp_path / "m.json")
+    )
+    assert X_train.shape == (16, 224, 224, 3)
+    assert len(X_val) == len(X_test) == 4
+    assert sorted(set(y_train.tolist())) == [0, 1]
+    assert (tmp_path / "m.json").exists()
+
+
+class _InlineExecutor:
+    """Runs pool.map in-process so monkeypatched functions are visible."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, *iterables, chunksize=1):
+        return map(fn, *iterables)
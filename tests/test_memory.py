@@ -0,0 +1,70 @@
+"""Unit tests for memory instrumentation."""
+
+import sys
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src import memory
+
+
+def test_rss_and_peak_are_positive():
+    """RSS is reported and never exceeds the peak."""
+    rss = memory.rss_bytes()
+    assert rss > 0
+    if sys.platform.startswith("linux"):
+        assert memory.peak_rss_bytes() >= rss
+
+
+def test_track_counts_until_collected():
+    """Tracked arrays are counted while alive."""
+    before = memory.live_counts()["ndarray"]
+    arr = memory.track(np.zeros(10), "ndarray")
+    assert memory.live_counts()["ndarray"] == before + 1
+    del arr
+    assert memory.live_counts()["ndarray"] == before
+
+
+def test_decode_image_tracks_every_pil_image(monkeypatch):
+    """Opened, converted and resized images are all counted while they are alive."""
+    from io import BytesIO
+    from PIL import Image
+    from src import preprocessing
+    buf = BytesIO()
+    Image.new("RGBA", (40, 30)).save(buf, format="PNG")
+
+    tracked = []
+    real_track = memory.track
+    monkeypatch.setattr(memory, "track", lambda obj, kind: tracked.append(kind) or real_track(obj, kind))
+    preprocessing.decode_image(buf.getvalue(), (16, 16))
+    assert tracked == ["pil_image"] * 3
+
+
+def test_tracemalloc_reports_growth_sites():
+    """Allocations after start_tracing show up as growth."""
+    memory.start_tracing(5)
+    try:
+        hog = [bytearray(1024) for _ in range(2000)]
+        top = memory.top_allocations(limit=5, growth=True)
+        assert top and top[0]["size_diff_bytes"] > 1_000_000
+        assert "test_memory.py" in top[0]["site"]
+        del hog
+    finally:
+        memory.stop_tracing()
+    assert memory.top_allocations() == []
+
+
+def test_admin_memory_requires_token(monkeypatch):
+    """/admin/memory is hidden without ADMIN_TOKEN and checks X-Admin-Token."""
+    from fastapi.testclient import TestClient
+    import app
+    client = TestClient(app.app)
+    monkeypatch.setattr(app, "ADMIN_TOKEN", None)
+    assert client.get("/admin/memory").status_code == 404
+    monkeypatch.setattr(app, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/memory", headers={"X-Admin-Token": "nope"}).status_code == 403
+    r = client.get("/admin/memory", headers={"X-Admin-Token": "secret"})
+    assert r.status_code == 200
+    assert set(r.json()["live_objects"]) == {"pil_image", "ndarray"}
+    assert "cats_dogs_api_memory_rss_bytes" in client.get("/metrics").text
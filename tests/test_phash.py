@@ -0,0 +1,110 @@
+"""Unit tests for the perceptual-hash near-duplicate cache."""
+
+import sys
+import numpy as np
+import pytest
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.phash import NearDuplicateIndex, dhash, hamming
+
+
+def _photo(seed=0, size=(320, 240)):
+    """Smooth synthetic image (gradients + blobs) so downsampling preserves structure."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w] / max(w, h)
+    img = np.zeros((h, w, 3))
+    for c in range(3):
+        for _ in range(4):
+            cx, cy, s = rng.random(3)
+            img[..., c] += np.exp(-((xx - cx) ** 2 + (yy - cy) ** 2) / (0.02 + 0.1 * s))
+    return Image.fromarray((255 * img / img.max()).astype(np.uint8))
+
+
+def _jpeg_bytes(img, quality=90):
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_dhash_survives_reencode_and_resize():
+    """Re-compressed and resized copies hash within a few bits; different images do not."""
+    from src.preprocessing import preprocess_for_inference
+    img = _photo(0)
+    original = dhash(preprocess_for_inference(_jpeg_bytes(img)))
+    copy = dhash(preprocess_for_inference(_jpeg_bytes(img.resize((200, 150)), quality=40)))
+    other = dhash(preprocess_for_inference(_jpeg_bytes(_photo(1))))
+    assert hamming(original, copy) <= 4
+    assert hamming(original, other) > 10
+
+
+def test_dhash_accepts_batched_array():
+    arr = np.asarray(_photo(0).resize((224, 224)))
+    assert dhash(arr) == dhash(arr[np.newaxis])
+    assert 0 <= dhash(arr) < 2 ** 64
+
+
+def test_index_lookup_within_radius():
+    """Lookup returns the closest entry within max_distance and its distance."""
+    index = NearDuplicateIndex(capacity=10, max_distance=3)
+    h = 0x0123456789ABCDEF
+    index.insert(h, "a")
+    assert index.lookup(h) == ("a", 0)
+    assert index.lookup(h ^ 0b101) == ("a", 2)
+    assert index.lookup(h ^ 0b1111) is None
+    index.insert(h ^ 0b1, "b")
+    assert index.lookup(h ^ 0b11) == ("b", 1)
+
+
+def test_index_evicts_least_recently_used():
+    index = NearDuplicateIndex(capacity=2, max_distance=0)
+    index.insert(1, "a")
+    index.insert(2, "b")
+    assert index.lookup(1) == ("a", 0)  # 2 is now least recently used
+    index.insert(3, "c")
+    assert len(index) == 2
+    assert index.lookup(2) is None
+    assert index.lookup(1) == ("a", 0) and index.lookup(3) == ("c", 0)
+
+
+def test_index_rejects_bad_distance():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(max_distance=64)
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, x, verbose=0):
+        self.calls += 1
+        return np.array([[0.3, 0.7]])
+
+
+def test_predict_serves_near_duplicate_from_cache(monkeypatch):
+    """A re-encoded copy of an already scored image skips inference and counts as a hit."""
+    from fastapi.testclient import TestClient
+    import app
+    model = _CountingModel()
+    monkeypatch.setattr(app, "MODEL", model)
+    monkeypatch.setattr(app, "PHASH_INDEX", NearDuplicateIndex(capacity=8, max_distance=4))
+    monkeypatch.setattr(app, "PHASH_VERIFY_RATE", 0.0)
+    client = TestClient(app.app)
+    hits_before = app.PHASH_LOOKUPS.labels(result="hit")._value.get()
+
+    img = _photo(0)
+    first = client.post("/predict", files={"file": ("a.jpg", _jpeg_bytes(img), "image/jpeg")})
+    second = client.post("/predict", files={"file": ("b.jpg", _jpeg_bytes(img, quality=50), "image/jpeg")})
+    assert first.json()["label"] == second.json()["label"] == "dog"
+    assert model.calls == 1
+    assert app.PHASH_LOOKUPS.labels(result="hit")._value.get() == hits_before + 1
+
+    monkeypatch.setattr(app, "PHASH_VERIFY_RATE", 1.0)
+    agree_before = app.PHASH_VERIFIED.labels(agreement="agree")._value.get()
+    client.post("/predict", files={"file": ("c.jpg", _jpeg_bytes(img), "image/jpeg")})
+    assert model.calls == 2
+    assert app.PHASH_VERIFIED.labels(agreement="agree")._value.get() == agree_before + 1
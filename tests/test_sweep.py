@@ -0,0 +1,118 @@
+"""Unit tests for hyperparameter sweep utilities."""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.sweep import (
+    grid_configs,
+    random_configs,
+    halving_rungs,
+    select_survivors,
+    prepare_shared_dataset,
+    load_shared_dataset,
+    MemmapBatches,
+    DATASET_KEYS,
+    DEFAULT_SEARCH_SPACE,
+    split_config,
+)
+
+SPACE = {"dense_units": [32, 64], "dropout": [0.3, 0.5], "batch_size": [32]}
+
+
+def test_grid_configs_covers_all_combinations():
+    """grid_configs returns the full cartesian product."""
+    configs = grid_configs(SPACE)
+    assert len(configs) == 4
+    assert {"dense_units": 64, "dropout": 0.3, "batch_size": 32} in configs
+
+
+def test_random_configs_distinct_and_reproducible():
+    """random_configs samples without replacement and respects the seed."""
+    a = random_configs(SPACE, 3, seed=1)
+    b = random_configs(SPACE, 3, seed=1)
+    assert a == b
+    assert len({tuple(sorted(c.items())) for c in a}) == 3
+    assert len(random_configs(SPACE, 100)) == 4
+
+
+def test_halving_rungs():
+    """halving_rungs grows the epoch budget geometrically up to max_epochs."""
+    assert halving_rungs(1, 9, 3) == [1, 3, 9]
+    assert halving_rungs(1, 3, 3) == [1, 3]
+    assert halving_rungs(5, 5, 3) == [5]
+    with pytest.raises(ValueError):
+        halving_rungs(1, 9, 1)
+
+
+def test_select_survivors_keeps_top_fraction():
+    """select_survivors keeps the best 1/eta trials, at least one."""
+    results = [{"trial_id": i, "val_accuracy": acc} for i, acc in enumerate([0.5, 0.9, 0.7, 0.6, 0.8, 0.55])]
+    assert select_survivors(results, eta=3) == [1, 4]
+    assert select_survivors(results[:1], eta=3) == [0]
+
+
+def test_shared_dataset_is_memory_mapped():
+    """prepare_shared_dataset unpacks the NPZ and load_shared_dataset mmaps it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        arrays = {k: np.arange(6, dtype=np.float32).reshape(2, 3) for k in DATASET_KEYS}
+        npz = Path(tmp) / "dataset.npz"
+        np.savez_compressed(npz, **arrays)
+        cache = prepare_shared_dataset(str(npz), str(Path(tmp) / "mmap"))
+        data = load_shared_dataset(str(cache))
+        assert isinstance(data["X_train"], np.memmap)
+        np.testing.assert_array_equal(data["X_test"], arrays["X_test"])
+
+
+def test_shared_dataset_cache_follows_source(tmp_path):
+    """Each NPZ gets its own cache; a changed NPZ or a stale shared cache dir is rebuilt."""
+    def write(path, value):
+        np.savez(path, **{k: np.full((2, 2), value, dtype=np.float32) for k in DATASET_KEYS})
+
+    a, b = tmp_path / "a.npz", tmp_path / "b.npz"
+    write(b, 2.0)
+    write(a, 1.0)  # a is newer than b
+    assert prepare_shared_dataset(str(a)) == tmp_path / "a.mmap"
+    assert load_shared_dataset(str(prepare_shared_dataset(str(b))))["X_train"][0, 0] == 2.0
+
+    shared = str(tmp_path / "shared")
+    assert load_shared_dataset(str(prepare_shared_dataset(str(a), shared)))["X_train"][0, 0] == 1.0
+    assert load_shared_dataset(str(prepare_shared_dataset(str(b), shared)))["X_train"][0, 0] == 2.0
+
+    write(a, 3.0)
+    os.utime(a, ns=(0, a.stat().st_mtime_ns + 10**9))  # coarse FS clocks can repeat mtimes
+    assert load_shared_dataset(str(prepare_shared_dataset(str(a))))["X_train"][0, 0] == 3.0
+
+
+def test_memmap_batches_cover_each_sample_once_per_epoch(tmp_path):
+    """Batches slice the memmap lazily; a shuffled epoch still visits every row exactly once."""
+    X = np.lib.format.open_memmap(tmp_path / "X.npy", mode="w+", dtype=np.float32, shape=(10, 2))
+    X[:] = np.arange(10)[:, None]
+    y = np.arange(10)
+    batches = MemmapBatches(X, y, batch_size=4, shuffle=True, seed=1)
+    assert len(batches) == 3
+    first = [batches[i] for i in range(len(batches))]
+    assert [len(b[1]) for b in first] == [4, 4, 2]
+    assert not isinstance(first[0][0], np.memmap)
+    np.testing.assert_array_equal(np.sort(np.concatenate([b[1] for b in first])), y)
+    for xb, yb in first:
+        np.testing.assert_array_equal(xb[:, 0], yb)
+    batches.on_epoch_end()
+    second = np.concatenate([batches[i][1] for i in range(len(batches))])
+    np.testing.assert_array_equal(np.sort(second), y)
+
+
+def test_sweep_config_hands_off_to_training():
+    """A trial's split config binds to build_cnn and train_and_track without TypeErrors."""
+    import inspect
+    from src.training import build_cnn, train_and_track
+    for config in random_configs(DEFAULT_SEARCH_SPACE, 5):
+        model_params, train_params = split_config(config)
+        assert set(model_params) | set(train_params) == set(config)
+        inspect.signature(build_cnn).bind(**model_params)
+        inspect.signature(train_and_track).bind(model_params=model_params, **train_params)
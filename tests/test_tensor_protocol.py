@@ -0,0 +1,132 @@
+"""Unit tests for the binary tensor protocol and /predict/tensor."""
+
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.tensor_protocol import (
+    MSGPACK,
+    OCTET_STREAM,
+    decode_probabilities,
+    decode_tensor_request,
+    encode_probabilities,
+    encode_tensor_request,
+)
+
+
+def test_raw_request_is_zero_copy():
+    """Raw bytes decode to a read-only (N, 224, 224, 3) view sharing the body buffer."""
+    images = np.random.randint(0, 255, (2, 224, 224, 3), dtype=np.uint8)
+    body = encode_tensor_request(images, OCTET_STREAM)
+    out = decode_tensor_request(body, "application/octet-stream")
+    assert out.shape == (2, 224, 224, 3)
+    assert not out.flags.writeable and not out.flags.owndata
+    np.testing.assert_array_equal(out, images)
+
+
+def test_single_image_and_msgpack_roundtrip():
+    """A single (224, 224, 3) image becomes a batch of one; msgpack carries the shape."""
+    pytest.importorskip("msgpack")
+    image = np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8)
+    assert decode_tensor_request(encode_tensor_request(image), OCTET_STREAM).shape == (1, 224, 224, 3)
+    out = decode_tensor_request(encode_tensor_request(image, MSGPACK), MSGPACK)
+    np.testing.assert_array_equal(out[0], image)
+
+
+def test_bad_requests_raise():
+    """Truncated bodies and unknown content types are rejected."""
+    with pytest.raises(ValueError):
+        decode_tensor_request(b"\x00" * 100, OCTET_STREAM)
+    with pytest.raises(LookupError):
+        decode_tensor_request(b"\x00" * 150528, "image/jpeg")
+
+
+def test_probabilities_roundtrip():
+    """float32 probabilities survive encode/decode for both formats."""
+    probs = np.array([[0.25, 0.75], [0.9, 0.1]], dtype=np.float32)
+    for media_type in (OCTET_STREAM, MSGPACK):
+        body, mt = encode_probabilities(probs, ["cat", "dog"], media_type)
+        np.testing.assert_array_equal(decode_probabilities(body, mt), probs)
+
+
+class _StubModel:
+    def predict(self, x, verbose=0):
+        assert x.dtype == np.float32 and x.max() <= 1.0
+        return np.tile([0.4, 0.6], (len(x), 1))
+
+
+def test_predict_tensor_endpoint(monkeypatch):
+    """/predict/tensor returns one float32 row per input image."""
+    from fastapi.testclient import TestClient
+    import app
+    monkeypatch.setattr(app, "MODEL", _StubModel())
+    client = TestClient(app.app)
+    images = np.zeros((3, 224, 224, 3), dtype=np.uint8)
+    r = client.post("/predict/tensor", content=encode_tensor_request(images),
+                    headers={"Content-Type": OCTET_STREAM})
+    assert r.status_code == 200
+    assert decode_probabilities(r.content, r.headers["content-type"]).shape == (3, 2)
+    r = client.post("/predict/tensor", content=b"abc", headers={"Content-Type": "text/plain"})
+    assert r.status_code == 415
+
+
+def test_predict_tensor_rejects_oversized_batch(monkeypatch):
+    """Batches over MAX_TENSOR_BATCH get 413 without reaching the model."""
+    from fastapi.testclient import TestClient
+    import app
+
+    class _NeverCalled:
+        def predict(self, x, verbose=0):
+            raise AssertionError("model must not run")
+
+    monkeypatch.setattr(app, "MODEL", _NeverCalled())
+    monkeypatch.setattr(app, "MAX_TENSOR_BATCH", 2)
+    client = TestClient(app.app)
+    body = encode_tensor_request(np.zeros((3, 224, 224, 3), dtype=np.uint8))
+    r = client.post("/predict/tensor", content=body, headers={"Content-Type": OCTET_STREAM})
+    assert r.status_code == 413
+    # Chunked bodies carry no Content-Length; reading stops at the size cap
+    r = client.post("/predict/tensor", content=iter([body]), headers={"Content-Type": OCTET_STREAM})
+    assert r.status_code == 413
+
+
+def test_predict_tensor_batches_do_not_collapse_limit(monkeypatch):
+    """A batch slower than the target overall but fast per image keeps the limit intact."""
+    import time
+    from fastapi.testclient import TestClient
+    import app
+    from src.concurrency import AIMDLimiter
+
+    class _SlowModel:
+        def predict(self, x, verbose=0):
+            time.sleep(0.002 * len(x))
+            return np.tile([0.4, 0.6], (len(x), 1))
+
+    monkeypatch.setattr(app, "MODEL", _SlowModel())
+    monkeypatch.setattr(app, "LIMITER", AIMDLimiter(initial_limit=4, latency_target_s=0.05))
+    client = TestClient(app.app)
+    body = encode_tensor_request(np.zeros((32, 224, 224, 3), dtype=np.uint8))
+    for _ in range(5):  # each batch takes > 64 ms against a 50 ms target
+        r = client.post("/predict/tensor", content=body, headers={"Content-Type": OCTET_STREAM})
+        assert r.status_code == 200
+    assert app.LIMITER.limit == 4
+
+
+def test_predict_tensor_maps_model_errors_to_400(monkeypatch):
+    """Model failures surface as a 400 with the error message, as on /predict."""
+    from fastapi.testclient import TestClient
+    import app
+
+    class _Broken:
+        def predict(self, x, verbose=0):
+            raise RuntimeError("bad input")
+
+    monkeypatch.setattr(app, "MODEL", _Broken())
+    client = TestClient(app.app)
+    r = client.post("/predict/tensor", content=encode_tensor_request(np.zeros((1, 224, 224, 3), dtype=np.uint8)),
+                    headers={"Content-Type": OCTET_STREAM})
+    assert r.status_code == 400
+    assert "bad input" in r.json()["detail"]
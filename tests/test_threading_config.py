@@ -0,0 +1,121 @@
+"""Unit tests for CPU quota detection and thread-pool settings."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src import threading_config
+from src.threading_config import (
+    candidate_thread_counts, cgroup_cpu_limit, default_settings, effective_cpus,
+    resolve_thread_settings, select_profiles, thread_env,
+)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 1.5
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    v1 = tmp_path / "cpu"
+    v1.mkdir()
+    (v1 / "cpu.cfs_period_us").write_text("100000")
+    (v1 / "cpu.cfs_quota_us").write_text("100000")
+    assert cgroup_cpu_limit(str(tmp_path)) == 1.0
+    (v1 / "cpu.cfs_quota_us").write_text("-1")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_effective_cpus_respects_quota(tmp_path, monkeypatch):
+    """A 1.5-CPU quota on an 8-core host gives 2 CPUs; no cgroup files gives the affinity count."""
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    assert effective_cpus(str(tmp_path)) == 8
+    (tmp_path / "cpu.max").write_text("150000 100000")
+    assert effective_cpus(str(tmp_path)) == 2
+    (tmp_path / "cpu.max").write_text("10000 100000")
+    assert effective_cpus(str(tmp_path)) == 1
+
+
+def test_default_settings_and_candidates():
+    assert default_settings(1) == {"intra_op": 1, "inter_op": 1}
+    assert default_settings(8) == {"intra_op": 8, "inter_op": 2}
+    assert candidate_thread_counts(1) == [1]
+    assert candidate_thread_counts(6) == [1, 2, 4, 6]
+
+
+def test_resolve_uses_profile_then_env(tmp_path, monkeypatch):
+    """Autotuned profile overrides defaults; TF_*_OP_THREADS env vars override both."""
+    monkeypatch.delenv("TF_INTRA_OP_THREADS", raising=False)
+    monkeypatch.delenv("TF_INTER_OP_THREADS", raising=False)
+    config = tmp_path / "thread_config.json"
+    assert resolve_thread_settings("latency", str(config), cpus=4) == {"intra_op": 4, "inter_op": 2, "cpus": 4}
+
+    config.write_text(json.dumps({"profiles": {
+        "latency": {"intra_op": 2, "inter_op": 1, "batch_size": 1},
+        "throughput": {"intra_op": 4, "inter_op": 1, "batch_size": 32},
+    }}))
+    assert resolve_thread_settings("throughput", str(config), cpus=4)["batch_size"] == 32
+    monkeypatch.setenv("THREAD_PROFILE", "latency")
+    assert resolve_thread_settings(None, str(config), cpus=4)["intra_op"] == 2
+    monkeypatch.setenv("TF_INTRA_OP_THREADS", "3")
+    assert resolve_thread_settings(None, str(config), cpus=4)["intra_op"] == 3
+    with pytest.raises(ValueError):
+        resolve_thread_settings("fastest", str(config), cpus=4)
+
+
+def test_apply_sets_native_thread_env(monkeypatch):
+    for var in (*threading_config.NATIVE_THREAD_VARS, "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("MKL_NUM_THREADS", "3")
+    monkeypatch.setattr(threading_config, "HAS_THREADPOOLCTL", False)
+    threading_config.apply_thread_settings({"intra_op": 2, "inter_op": 1})
+    assert os.environ["OMP_NUM_THREADS"] == os.environ["OPENBLAS_NUM_THREADS"] == "2"
+    assert os.environ["MKL_NUM_THREADS"] == "3"  # explicit setting kept
+    assert os.environ["TF_NUM_INTRAOP_THREADS"] == "2"
+    assert os.environ["TF_NUM_INTEROP_THREADS"] == "1"
+
+
+def test_select_profiles():
+    """Throughput takes the highest images/s; latency the lowest p99 at the smallest batch."""
+    trials = [
+        {"intra_op": 1, "inter_op": 1, "batch_size": 1, "images_per_s": 50, "p50_ms": 19, "p99_ms": 30},
+        {"intra_op": 2, "inter_op": 1, "batch_size": 1, "images_per_s": 60, "p50_ms": 15, "p99_ms": 40},
+        {"intra_op": 2, "inter_op": 2, "batch_size": 32, "images_per_s": 200, "p50_ms": 150, "p99_ms": 170},
+        {"intra_op": 1, "inter_op": 1, "batch_size": 32, "images_per_s": 120, "p50_ms": 260, "p99_ms": 280},
+    ]
+    profiles = select_profiles(trials)
+    assert (profiles["throughput"]["intra_op"], profiles["throughput"]["batch_size"]) == (2, 32)
+    assert (profiles["latency"]["intra_op"], profiles["latency"]["batch_size"]) == (1, 1)
+
+
+def test_thread_env_pins_child_pools():
+    env = thread_env({"intra_op": 1, "inter_op": 1}, {"PATH": "/bin", "OMP_NUM_THREADS": "8"})
+    assert env["PATH"] == "/bin"
+    assert env["OMP_NUM_THREADS"] == env["MKL_NUM_THREADS"] == env["TF_INTRA_OP_THREADS"] == "1"
+    assert env["TF_NUM_INTEROP_THREADS"] == "1"
+
+
+def test_profile_latency_runs_under_serving_threads(monkeypatch):
+    """Candidate latency is measured in a child process pinned to the given thread settings."""
+    import subprocess
+    from src import training
+    calls = []
+
+    def fake_run(cmd, env=None, **kwargs):
+        calls.append((cmd, env))
+        out = json.dumps({"latency_single_ms": 3.0, "latency_batch_ms": 40.0})
+        return subprocess.CompletedProcess(cmd, 0, stdout=out + "\n", stderr="")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    result = training._latency_in_subprocess("m.h5", 8, 5, {"intra_op": 1, "inter_op": 1, "cpus": 1})
+    assert result["latency_single_ms"] == 3.0
+    cmd, env = calls[0]
+    assert json.loads(cmd[-1])["threads"] == {"intra_op": 1, "inter_op": 1}
+    assert env["TF_NUM_INTRAOP_THREADS"] == env["OMP_NUM_THREADS"] == "1"
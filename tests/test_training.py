@@ -0,0 +1,50 @@
+"""Unit tests for the architecture registry and latency-budget selection."""
+
+import sys
+import numpy as np
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.sweep import DATASET_KEYS
+from src.training import ARCHITECTURES, _load_dataset, build_model, select_within_budget
+
+PROFILES = {
+    "simple_cnn": {"accuracy": 0.90, "latency_single_ms": 40.0},
+    "gap_cnn": {"accuracy": 0.88, "latency_single_ms": 25.0},
+    "tiny_student": {"accuracy": 0.84, "latency_single_ms": 4.0},
+}
+
+
+def test_registry_has_efficient_architectures():
+    """Registry exposes the baseline plus GAP, separable and tiny student variants."""
+    assert {"simple_cnn", "gap_cnn", "separable_cnn", "tiny_student"} <= set(ARCHITECTURES)
+
+
+def test_build_model_unknown_architecture():
+    """build_model rejects names that are not registered."""
+    with pytest.raises(ValueError):
+        build_model("resnet9000")
+
+
+def test_select_within_budget_picks_most_accurate_that_fits():
+    """Most accurate model under the budget wins."""
+    assert select_within_budget(PROFILES, 30.0) == "gap_cnn"
+    assert select_within_budget(PROFILES, 5.0) == "tiny_student"
+    assert select_within_budget(PROFILES) == "simple_cnn"
+
+
+def test_select_within_budget_falls_back_to_fastest():
+    """Nothing within budget: fastest candidate is returned."""
+    assert select_within_budget(PROFILES, 1.0) == "tiny_student"
+
+
+def test_load_dataset_only_unpacks_when_mmap_cache_requested(tmp_path):
+    """Training loads the NPZ directly; the uncompressed mmap copy is opt-in."""
+    npz = tmp_path / "dataset.npz"
+    np.savez_compressed(npz, **{k: np.ones((2, 2), dtype=np.float32) for k in DATASET_KEYS})
+    data = _load_dataset(str(npz))
+    assert not isinstance(data["X_train"], np.memmap)
+    assert not (tmp_path / "dataset.mmap").exists()
+    assert isinstance(_load_dataset(str(npz), mmap_cache=True)["X_test"], np.memmap)